@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from app_run.models import Run, Challenge, Position, CollectibleItem
+from app_run.models import Run, Challenge, Position, CollectibleItem, AthleteStats
 
 admin.site.register(Run)
 admin.site.register(Challenge)
 admin.site.register(Position)
 admin.site.register(CollectibleItem)
+admin.site.register(AthleteStats)
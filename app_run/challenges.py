@@ -0,0 +1,80 @@
+"""Правила челленджей.
+
+Правило — порог по одной метрике: накопительной (AthleteStats) или по только что завершённому забегу.
+Правила проверяются в Python по уже посчитанным итогам, награды вставляются одним bulk_create;
+повторная вставка отсекается уникальным ограничением (athlete, rule). Поэтому число запросов
+при завершении забега не зависит от количества правил.
+"""
+from app_run.models import Challenge
+from app_run.response_cache import invalidate, CHALLENGES
+
+FINISHED_RUNS = 'finished_runs'
+TOTAL_DISTANCE = 'total_distance'
+ITEMS_COLLECTED = 'items_collected'
+RUN_DISTANCE = 'run_distance'
+RUN_PACE = 'run_pace'  # Секунд на километр, чем меньше, тем лучше.
+
+METRICS = (FINISHED_RUNS, TOTAL_DISTANCE, ITEMS_COLLECTED, RUN_DISTANCE, RUN_PACE)
+
+
+class Rule:
+    def __init__(self, code, full_name, metric, threshold, lower_is_better=False):
+        if metric not in METRICS:
+            raise ValueError(f'Unknown challenge metric: {metric}')
+        self.code = code
+        self.full_name = full_name
+        self.metric = metric
+        self.threshold = threshold
+        self.lower_is_better = lower_is_better
+
+    def __repr__(self):
+        return f'Rule({self.code!r}, {self.metric} {"<=" if self.lower_is_better else ">="} {self.threshold})'
+
+    def is_met(self, values):
+        value = values.get(self.metric)
+        if value is None:
+            return False
+        return value <= self.threshold if self.lower_is_better else value >= self.threshold
+
+
+RULES = {}
+
+
+def register(rule):
+    RULES[rule.code] = rule
+    return rule
+
+
+register(Rule('runs_10', 'Сделай 10 Забегов!', FINISHED_RUNS, 10))
+register(Rule('distance_50', 'Пробеги 50 километров!', TOTAL_DISTANCE, 50))
+
+
+def metrics(stats, run=None):
+    values = {
+        FINISHED_RUNS: stats.finished_runs,
+        TOTAL_DISTANCE: stats.total_distance,
+        ITEMS_COLLECTED: stats.items_collected,
+    }
+    if run is not None and run.distance:
+        values[RUN_DISTANCE] = run.distance
+        if run.run_time_seconds:
+            values[RUN_PACE] = run.run_time_seconds / run.distance
+    return values
+
+
+def award(athlete_info, stats, run=None):
+    """Вставляет челленджи по выполненным правилам, которых у атлета ещё нет. Возвращает вставленные."""
+    values = metrics(stats, run)
+    met = [rule for rule in RULES.values() if rule.is_met(values)]
+    if not met:
+        return []
+    # Правила пороговые и выполняются на каждом следующем забеге: кэш сбрасывается только при новых наградах.
+    awarded = set(Challenge.objects.filter(athlete=athlete_info, rule__in=[rule.code for rule in met])
+                  .values_list('rule', flat=True))
+    challenges = [Challenge(athlete=athlete_info, rule=rule.code, full_name=rule.full_name)
+                  for rule in met if rule.code not in awarded]
+    if challenges:
+        # ignore_conflicts — на случай параллельного завершения двух забегов атлета.
+        Challenge.objects.bulk_create(challenges, ignore_conflicts=True)
+        invalidate(CHALLENGES)
+    return challenges
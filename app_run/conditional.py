@@ -0,0 +1,90 @@
+"""ETag и Last-Modified для условных GET (If-None-Match / If-Modified-Since).
+
+Состояние ответа берётся одним запросом по столбцам updated_at, без сериализации тела:
+при совпадении Django возвращает 304 и представление не вызывается.
+Last-Modified отдаётся только для точек завершённых забегов: они больше не меняются,
+а точности в секунду для забега в процессе записи мало. Карточка забега содержит имя атлета,
+у которого нет времени изменения, поэтому для неё только ETag.
+"""
+import hashlib
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Sum, F
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from app_run.models import Run
+
+
+def _etag(request, *parts):
+    # Тело зависит и от параметров запроса (страница, формат), и от рендерера.
+    raw = '|'.join(map(str, (*parts, request.get_full_path(), request.META.get('HTTP_ACCEPT', ''))))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _memoized(state_func):
+    """Состояние считается один раз на запрос: condition вызывает и etag_func, и last_modified_func."""
+
+    def wrapper(request, *args, **kwargs):
+        cache = request.__dict__.setdefault('_conditional_state', {})
+        if state_func not in cache:
+            cache[state_func] = state_func(request, *args, **kwargs)
+        return cache[state_func]
+
+    return wrapper
+
+
+def _first(queryset, pk):
+    # Некорректный id: пусть представление само ответит 404.
+    try:
+        return queryset.filter(pk=pk).first()
+    except (TypeError, ValueError):
+        return None
+
+
+@_memoized
+def _run_state(request, pk=None, **kwargs):
+    return _first(Run.objects.values_list('status', 'updated_at', 'athlete__username', 'athlete__first_name',
+                                          'athlete__last_name'), pk)
+
+
+@_memoized
+def _positions_state(request, *args, **kwargs):
+    run_id = request.GET.get('run')
+    return _first(Run.objects.values_list('status', 'updated_at'), run_id) if run_id else None
+
+
+@_memoized
+def _user_state(request, pk=None, **kwargs):
+    # Набор предметов — по сумме id и сумме их квадратов: замена предмета старым не меняет
+    # ни количество, ни последний updated_at, а строки AthleteStats у пользователя может не быть.
+    item_id = F('collectible_items__id')
+    return _first(User.objects.filter(is_superuser=False).annotate(
+        items_updated_at=Max('collectible_items__updated_at'), items=Count('collectible_items'),
+        items_ids=Sum(item_id), items_ids_squares=Sum(item_id * item_id)).values_list(
+        'username', 'first_name', 'last_name', 'is_staff', 'date_joined', 'stats__updated_at', 'items_updated_at',
+        'items', 'items_ids', 'items_ids_squares'), pk)
+
+
+def _run_condition(state_func, kind, with_last_modified=True):
+    def etag(request, *args, **kwargs):
+        state = state_func(request, *args, **kwargs)
+        return state and _etag(request, kind, *state)
+
+    def last_modified(request, *args, **kwargs):
+        state = state_func(request, *args, **kwargs)
+        if state and state[0] == 'finished':
+            return state[1]
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified if with_last_modified else None))
+
+
+def _user_etag(request, *args, **kwargs):
+    state = _user_state(request, *args, **kwargs)
+    return state and _etag(request, 'user', *state)
+
+
+run_conditional = _run_condition(_run_state, 'run', with_last_modified=False)
+positions_conditional = _run_condition(_positions_state, 'positions')
+# У пользователя нет столбца времени изменения (имя правится в admin), поэтому только ETag.
+user_conditional = method_decorator(condition(etag_func=_user_etag))
@@ -0,0 +1,60 @@
+import math
+
+from django.db.models import Q
+
+# Размер ячейки сетки в градусах (~1.1 км по широте).
+CELL_SIZE = 0.01
+LON_CELLS = int(round(360 / CELL_SIZE))
+
+PICKUP_RADIUS_M = 100
+
+# Минимальная длина градуса широты на эллипсоиде WGS-84, с запасом.
+METERS_PER_DEGREE = 110_000
+
+
+def grid_cell(latitude, longitude):
+    return math.floor(latitude / CELL_SIZE), _wrap_lon_cell(math.floor(longitude / CELL_SIZE))
+
+
+def _wrap_lon_cell(cell):
+    half = LON_CELLS // 2
+    return (cell + half) % LON_CELLS - half
+
+
+def nearby_cells_q(latitude, longitude, radius_m=PICKUP_RADIUS_M):
+    """Q-фильтр по ячейкам сетки, покрывающим круг radius_m вокруг точки."""
+    dlat = radius_m / METERS_PER_DEGREE
+    lat_from = math.floor((latitude - dlat) / CELL_SIZE)
+    lat_to = math.floor((latitude + dlat) / CELL_SIZE)
+    query = Q(cell_lat__range=(lat_from, lat_to))
+
+    max_lat = min(abs(latitude) + dlat, 90)
+    cos_lat = math.cos(math.radians(max_lat))
+    if cos_lat < 1e-6:
+        return query
+    dlon = dlat / cos_lat
+    if dlon >= 180:
+        return query
+
+    lon_from = math.floor((longitude - dlon) / CELL_SIZE)
+    lon_to = math.floor((longitude + dlon) / CELL_SIZE)
+    wrapped_from, wrapped_to = _wrap_lon_cell(lon_from), _wrap_lon_cell(lon_to)
+    if wrapped_from <= wrapped_to:
+        return query & Q(cell_lon__range=(wrapped_from, wrapped_to))
+    # Диапазон пересекает меридиан 180°.
+    half = LON_CELLS // 2
+    return query & (Q(cell_lon__range=(wrapped_from, half - 1)) | Q(cell_lon__range=(-half, wrapped_to)))
+
+
+def nearby_cells_q_for_points(points, radius_m=PICKUP_RADIUS_M):
+    """Объединение nearby_cells_q для нескольких точек без повторяющихся условий."""
+    queries = []
+    for latitude, longitude in points:
+        query = nearby_cells_q(latitude, longitude, radius_m)
+        if query not in queries:
+            queries.append(query)
+    result = Q()
+    for query in queries:
+        result |= query
+    return result
+
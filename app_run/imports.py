@@ -0,0 +1,68 @@
+from itertools import islice
+
+from app_run.models import CollectibleItem
+from app_run.response_cache import invalidate, ITEMS
+from app_run.serializers import CollectibleItemImportSerializer
+
+IMPORT_CHUNK_SIZE = 500
+COLUMNS = ('name', 'uid', 'value', 'latitude', 'longitude', 'picture')
+
+
+def _uid_key(value):
+    return None if value is None else str(value)
+
+
+def _import_chunk(rows):
+    """Проверяет и сохраняет пачку строк. Возвращает (вставлено, пропущено, невалидные строки)."""
+    parsed = []
+    for row in rows:
+        data = dict(zip(COLUMNS, row + (None,) * (len(COLUMNS) - len(row))))
+        serializer = CollectibleItemImportSerializer(data=data)
+        parsed.append((row, data, serializer.validated_data if serializer.is_valid() else None))
+
+    uids = {_uid_key(data['uid']) for _, data, _ in parsed} | {validated['uid'] for _, _, validated in parsed
+                                                               if validated is not None}
+    uids.discard(None)
+    seen = set(CollectibleItem.objects.filter(uid__in=uids).values_list('uid', flat=True))
+
+    items = []
+    skipped = 0
+    invalid_rows = []
+    for row, data, validated in parsed:
+        if _uid_key(data['uid']) in seen:
+            skipped += 1
+        elif validated is None or validated['uid'] in seen:
+            invalid_rows.append(list(row))
+        else:
+            item = CollectibleItem(**validated)
+            item.update_cell()
+            items.append(item)
+            seen.add(item.uid)
+
+    if items:
+        # bulk_create не отправляет post_save.
+        CollectibleItem.objects.bulk_create(items)
+        invalidate(ITEMS)
+    return len(items), skipped, invalid_rows
+
+
+def import_collectible_items(file, chunk_size=None, progress=None):
+    """Потоково импортирует собираемые предметы из xlsx. Возвращает список невалидных строк.
+
+    progress(rows, inserted, skipped, invalid_rows) вызывается после каждой пачки.
+    """
+    from openpyxl.reader.excel import load_workbook  # Тяжёлый импорт, нужен только при загрузке файла.
+
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    wb = load_workbook(filename=file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(min_row=2, values_only=True)
+        invalid_rows = []
+        while chunk := list(islice(rows, chunk_size)):
+            inserted, skipped, chunk_invalid_rows = _import_chunk(chunk)
+            invalid_rows.extend(chunk_invalid_rows)
+            if progress is not None:
+                progress(len(chunk), inserted, skipped, chunk_invalid_rows)
+    finally:
+        wb.close()
+    return invalid_rows
@@ -0,0 +1,81 @@
+import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from app_run.imports import import_collectible_items
+from app_run.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMPORT_JOB_WORKERS, thread_name_prefix='import-job')
+    return _executor
+
+
+def submit_import_job(job_id):
+    """Ставит задачу в локальный пул потоков; при IMPORT_JOB_WORKERS = 0 выполняет сразу."""
+    if settings.IMPORT_JOB_WORKERS:
+        _get_executor().submit(_run_in_thread, job_id)
+    else:
+        run_import_job(job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def claimable():
+    """Ожидающие задачи и зависшие: running дольше IMPORT_JOB_STALE_SECONDS, то есть процесс воркера
+    умер или контейнер Lambda был заморожен и переработан посреди импорта."""
+    stale_before = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    # Задачи, захваченные до появления started_at, проверяются по времени создания.
+    return Q(status='pending') | Q(status='running', started_at__lt=stale_before) | Q(
+        status='running', started_at__isnull=True, created_at__lt=stale_before)
+
+
+def run_import_job(job_id):
+    # Захват задачи условным UPDATE: одну задачу не обработают два воркера.
+    # Повторный импорт зависшей задачи начинает счётчики заново; уже вставленные строки
+    # при этом попадают в skipped.
+    if not ImportJob.objects.filter(claimable(), id=job_id).update(
+            status='running', started_at=timezone.now(), rows_processed=0, inserted=0, skipped=0, invalid=0):
+        return
+    job = ImportJob.objects.get(id=job_id)
+
+    def progress(rows, inserted, skipped, invalid_rows):
+        ImportJob.objects.filter(id=job_id).update(rows_processed=F('rows_processed') + rows,
+                                                   inserted=F('inserted') + inserted,
+                                                   skipped=F('skipped') + skipped,
+                                                   invalid=F('invalid') + len(invalid_rows))
+
+    try:
+        invalid_rows = import_collectible_items(BytesIO(job.file), progress=progress)
+    except Exception as e:
+        logger.exception('Import job %s failed', job_id)
+        ImportJob.objects.filter(id=job_id).update(status='failed', error=str(e), file=b'',
+                                                   finished_at=timezone.now())
+        return
+    ImportJob.objects.filter(id=job_id).update(status='finished', invalid_rows=invalid_rows, file=b'',
+                                               finished_at=timezone.now())
+
+
+def run_pending_jobs():
+    count = 0
+    for job_id in ImportJob.objects.filter(claimable()).order_by('id').values_list('id', flat=True):
+        run_import_job(job_id)
+        count += 1
+    return count
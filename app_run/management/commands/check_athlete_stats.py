@@ -0,0 +1,52 @@
+import math
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app_run.models import AthleteStats
+from app_run.response_cache import invalidate, user_namespace
+
+
+class Command(BaseCommand):
+    help = 'Сверяет AthleteStats с итогами, посчитанными по забегам; с --fix исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Id пользователей; по умолчанию все.')
+        parser.add_argument('--fix', action='store_true', help='Пересчитать записи с расхождениями.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        stored = {stats.user_id: stats for stats in AthleteStats.objects.filter(user__in=users)}
+
+        mismatched = []
+        for user_id in users.values_list('id', flat=True).iterator():
+            expected = AthleteStats.calculate(user_id)
+            stats = stored.get(user_id)
+            if stats is None:
+                if expected['finished_runs']:
+                    mismatched.append(user_id)
+                    self.stdout.write(f'user {user_id}: stats missing')
+                continue
+            fields = [field for field, value in expected.items() if not self.same(getattr(stats, field), value)]
+            if fields:
+                mismatched.append(user_id)
+                self.stdout.write(f'user {user_id}: ' + ', '.join(
+                    f'{field} {getattr(stats, field)} != {expected[field]}' for field in fields))
+
+        if mismatched and options['fix']:
+            for user_id in mismatched:
+                AthleteStats.rebuild(user_id)
+            invalidate(*[user_namespace(user_id) for user_id in mismatched])
+            self.stdout.write(self.style.SUCCESS(f'Fixed stats for {len(mismatched)} users.'))
+        elif mismatched:
+            raise CommandError(f'Stats mismatch for {len(mismatched)} users.')
+        else:
+            self.stdout.write(self.style.SUCCESS('Stats are consistent.'))
+
+    @staticmethod
+    def same(stored, expected):
+        if isinstance(expected, float):
+            return math.isclose(stored, expected, rel_tol=1e-9, abs_tol=1e-9)
+        return stored == expected
@@ -0,0 +1,108 @@
+import random
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_run.models import Run, Position, CollectibleItem, AthleteInfo, AthleteStats
+from app_run.track import segment_lengths
+
+# Район города ~55 x 30 км.
+LAT_RANGE = (55.5, 56.0)
+LON_RANGE = (37.3, 37.8)
+USERNAME_PREFIX = 'synthetic_'
+UID_PREFIX = 'synthetic-'
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетические данные для нагрузочных тестов: пользователей с забегами и GPS-треками '
+            'и каталог собираемых предметов. При одном --seed треки и предметы совпадают.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--runs-per-user', type=int, default=5)
+        parser.add_argument('--positions-per-run', type=int, default=200)
+        parser.add_argument('--items', type=int, default=50_000)
+        parser.add_argument('--in-progress', type=float, default=0.2, help='Доля незавершённых забегов.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Удалить ранее созданные синтетические данные.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            CollectibleItem.objects.filter(uid__startswith=UID_PREFIX).delete()
+
+        rnd = random.Random(options['seed'])
+        rng = np.random.default_rng(options['seed'])
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            runs = self.create_runs(users, options['runs_per_user'], options['positions_per_run'],
+                                    options['in_progress'], rnd, rng)
+            items = self.create_items(options['items'], rnd)
+            for user in users:
+                AthleteStats.rebuild(user.id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {runs} runs, {runs * options["positions_per_run"]} positions, '
+            f'{items} collectible items.'))
+
+    def create_users(self, count):
+        start = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        users = User.objects.bulk_create(
+            [User(username=f'{USERNAME_PREFIX}{i}', first_name=f'Name{i}', last_name=f'Surname{i}',
+                  is_staff=i % 10 == 0) for i in range(start, start + count)], batch_size=BATCH_SIZE)
+        AthleteInfo.objects.bulk_create([AthleteInfo(user=user, goals='', weight=70) for user in users],
+                                        batch_size=BATCH_SIZE)
+        return users
+
+    def create_runs(self, users, runs_per_user, positions_per_run, in_progress, rnd, rng):
+        runs, tracks = [], []
+        now = timezone.now()
+        for user in users:
+            for _ in range(runs_per_user):
+                # Случайное блуждание с шагом ~10 м раз в 3 секунды.
+                start = (rnd.uniform(*LAT_RANGE), rnd.uniform(*LON_RANGE))
+                steps = rng.normal(0, 0.00009, size=(positions_per_run, 2))
+                steps[0] = 0
+                coordinates = np.asarray(start) + steps.cumsum(axis=0)
+                started_at = now - timedelta(days=rnd.uniform(0, 365))
+                times = [started_at + timedelta(seconds=3 * i) for i in range(positions_per_run)]
+
+                run = Run(athlete=user, status='in_progress' if rnd.random() < in_progress else 'finished',
+                          comment='synthetic', positions_count=positions_per_run)
+                if positions_per_run:
+                    run.track_distance = float(segment_lengths(coordinates[:, 0], coordinates[:, 1]).sum()) / 1000
+                    run.min_date_time, run.max_date_time = times[0], times[-1]
+                    run.last_latitude, run.last_longitude = coordinates[-1].tolist()
+                if run.status == 'finished':
+                    run.distance = round(run.track_distance, 3)
+                    run.run_time_seconds = 3 * max(positions_per_run - 1, 0)
+                runs.append(run)
+                tracks.append((coordinates.tolist(), times))
+
+        runs = Run.objects.bulk_create(runs, batch_size=BATCH_SIZE)
+        positions = []
+        for run, (coordinates, times) in zip(runs, tracks):
+            positions.extend(Position(run=run, latitude=latitude, longitude=longitude, date_time=date_time)
+                             for (latitude, longitude), date_time in zip(coordinates, times))
+            if len(positions) >= BATCH_SIZE:
+                Position.objects.bulk_create(positions, batch_size=BATCH_SIZE)
+                positions = []
+        Position.objects.bulk_create(positions, batch_size=BATCH_SIZE)
+        return len(runs)
+
+    def create_items(self, count, rnd):
+        start = CollectibleItem.objects.filter(uid__startswith=UID_PREFIX).count()
+        items = []
+        for i in range(start, start + count):
+            item = CollectibleItem(name=f'item {i}', uid=f'{UID_PREFIX}{i}', value=rnd.randint(1, 100),
+                                   picture=f'https://example.com/items/{i}.png',
+                                   latitude=rnd.uniform(*LAT_RANGE), longitude=rnd.uniform(*LON_RANGE))
+            item.update_cell()
+            items.append(item)
+        CollectibleItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        return count
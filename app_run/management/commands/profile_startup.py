@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Модули, которые не должны загружаться при холодном старте: они нужны только отдельным эндпоинтам.
+HEAVY_MODULES = ('numpy', 'openpyxl', 'geopy')
+
+# Выполняется в отдельном интерпретаторе: импорт WSGI-приложения и первый запрос без обращения к БД.
+CHILD_SCRIPT = '''
+import io, json, sys, time
+started = time.perf_counter()
+from project_run.wsgi import application
+ready = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+}
+status = []
+response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+b''.join(response)
+finished = time.perf_counter()
+print(json.dumps({
+    'app_ready_ms': (ready - started) * 1000,
+    'first_request_ms': (finished - ready) * 1000,
+    'status': status[0],
+    'heavy_modules': [name for name in sys.argv[2:] if name in sys.modules],
+}))
+'''
+
+
+def measure_startup(path='/api/company_details/', settings_module=None):
+    """Холодный старт в новом процессе: время до готовности WSGI-приложения, первый запрос, время импорта модулей."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module or os.environ['DJANGO_SETTINGS_MODULE']}
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, path, *HEAVY_MODULES],
+                             cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    if process.returncode:
+        raise CommandError(process.stderr[-2000:])
+
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                        'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return {**json.loads(process.stdout.strip().splitlines()[-1]), 'imports': imports}
+
+
+class Command(BaseCommand):
+    help = ('Профилирует холодный старт: время импорта модулей (python -X importtime), время до готовности '
+            'WSGI-приложения project_run.wsgi и первого запроса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/company_details/', help='Первый запрос после старта.')
+        parser.add_argument('--top', type=int, default=25, help='Сколько модулей показать.')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON.')
+
+    def handle(self, *args, **options):
+        result = measure_startup(options['path'], options['settings'])
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        key = f'{options["sort"]}_ms'
+        self.stdout.write(f'{"self, ms":>10} {"cumulative, ms":>15}  module')
+        for row in sorted(result['imports'], key=lambda row: row[key], reverse=True)[:options['top']]:
+            self.stdout.write(f'{row["self_ms"]:10.1f} {row["cumulative_ms"]:15.1f}  {"  " * row["depth"]}'
+                              f'{row["module"]}')
+
+        self.stdout.write('')
+        self.stdout.write(f'WSGI application ready: {result["app_ready_ms"]:.1f} ms')
+        self.stdout.write(f'First request {options["path"]}: {result["first_request_ms"]:.1f} ms '
+                          f'(status {result["status"]})')
+        if result['heavy_modules']:
+            self.stdout.write(self.style.WARNING(f'Loaded at startup: {", ".join(result["heavy_modules"])}'))
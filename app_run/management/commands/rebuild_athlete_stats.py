@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from app_run.models import AthleteStats
+from app_run.response_cache import invalidate, user_namespace
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает итоги атлетов (AthleteStats) по завершённым забегам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Id пользователей; по умолчанию все.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        count = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            AthleteStats.rebuild(user_id)
+            invalidate(user_namespace(user_id))
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} users.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_run.models import Run
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает накопительные итоги забегов (дистанция, время, количество точек) по сохранённым позициям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('run_ids', nargs='*', type=int, help='Id забегов; по умолчанию все.')
+        parser.add_argument('--status', choices=[choice for choice, _ in Run.STATUS_CHOICES])
+
+    def handle(self, *args, **options):
+        runs = Run.objects.order_by('id')
+        if options['run_ids']:
+            runs = runs.filter(id__in=options['run_ids'])
+        if options['status']:
+            runs = runs.filter(status=options['status'])
+
+        count = 0
+        for run_id in runs.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                Run.locked(run_id).rebuild_track()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals for {count} runs.'))
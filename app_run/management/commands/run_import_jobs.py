@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from app_run.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает ожидающие и зависшие (running дольше IMPORT_JOB_STALE_SECONDS) фоновые импорты xlsx, '
+            'например по расписанию на Lambda.')
+
+    def handle(self, *args, **options):
+        count = run_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Processed {count} import jobs.'))
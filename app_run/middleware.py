@@ -0,0 +1,203 @@
+import cProfile
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import resolve, Resolver404
+
+from app_run.routers import read_from_replica, replicas
+
+logger = logging.getLogger('app_run.metrics')
+
+_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _install_serializer_timing():
+    """Оборачивает BaseSerializer.data: учитывается время верхнего уровня сериализации, без вложенных."""
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.data.fget, '_timed', False):
+        return
+    data = BaseSerializer.data
+
+    def timed_data(serializer):
+        metrics = _metrics.get()
+        if metrics is None:
+            return data.fget(serializer)
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += time.perf_counter() - start
+
+    timed_data._timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class RequestMetricsMiddleware:
+    """Число SQL-запросов, время БД, сериализации и всего запроса: заголовок Server-Timing и лог app_run.metrics.
+
+    При REQUEST_METRICS_ENABLED = False Django исключает middleware из цепочки при старте.
+    Для потоковых ответов время генерации тела не учитывается.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        self.slow_queries = settings.REQUEST_METRICS_SLOW_QUERIES
+        _install_serializer_timing()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = metrics.db_time * 1000
+        serializer_ms = metrics.serializer_time * 1000
+
+        response['Server-Timing'] = (f'db;dur={db_ms:.1f};desc="{metrics.queries} queries", '
+                                     f'serializer;dur={serializer_ms:.1f}, total;dur={total_ms:.1f}')
+
+        slow = total_ms >= self.slow_ms or metrics.queries >= self.slow_queries
+        match = request.resolver_match
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(db_ms, 1),
+            'serializer_ms': round(serializer_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'slow': slow,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO,
+                   ' '.join(f'{key}={value}' for key, value in fields.items()), extra={'metrics': fields})
+        return response
+
+
+class ProfilingMiddleware:
+    """cProfile для доли запросов к выбранным маршрутам.
+
+    PROFILE_ROUTES — имена маршрутов (``api-runs-stop``) или ``имя:МЕТОД`` (``api-positions-list:POST``).
+    Профили суммируются в PROFILE_DIR/<маршрут>.<метод>.pstats; файл больше PROFILE_MAX_BYTES
+    переименовывается в .1, .2, ... (хранится PROFILE_BACKUP_COUNT штук). Смотреть: python -m pstats <файл>.
+    """
+
+    def __init__(self, get_response):
+        routes = getattr(settings, 'PROFILE_ROUTES', [])
+        self.sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        if not routes or self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.routes = {tuple(route.split(':', 1)) if ':' in route else (route, None) for route in routes}
+        self.directory = Path(settings.PROFILE_DIR)
+        self.max_bytes = settings.PROFILE_MAX_BYTES
+        self.backup_count = settings.PROFILE_BACKUP_COUNT
+        # Одновременно может работать только один профилировщик на процесс.
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        try:
+            route = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+        if (route, None) not in self.routes and (route, request.method) not in self.routes:
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            self.save(profiler, f'{route}.{request.method}')
+        finally:
+            self.lock.release()
+        return response
+
+    def save(self, profiler, name):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{name}.pstats'
+        stats = pstats.Stats(profiler)
+        if path.exists():
+            if path.stat().st_size > self.max_bytes:
+                self.rotate(path)
+            else:
+                stats.add(str(path))
+        stats.dump_stats(path)
+
+    def rotate(self, path):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = path.with_name(f'{path.name}.{index}')
+            if source.exists():
+                source.replace(path.with_name(f'{path.name}.{index + 1}'))
+        if self.backup_count:
+            path.replace(path.with_name(f'{path.name}.1'))
+        else:
+            path.unlink()
+
+
+class ReplicaMiddleware:
+    """Безопасные запросы читают с реплик (app_run.routers.ReplicaRouter), остальные — из default.
+
+    После небезопасного запроса клиент получает cookie REPLICA_PIN_COOKIE на REPLICA_PIN_SECONDS
+    (не меньше задержки репликации): пока она есть, его чтения тоже идут в default и он видит свои записи.
+    Тело потокового ответа читается уже после middleware, то есть из default.
+    """
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cookie = settings.REPLICA_PIN_COOKIE
+        self.pin_seconds = settings.REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        with read_from_replica(safe and self.cookie not in request.COOKIES):
+            response = self.get_response(request)
+        if not safe:
+            response.set_cookie(self.cookie, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 09:27
+
+from django.conf import settings
+import math
+
+from django.db import migrations, models
+
+# Копия app_run.geo.grid_cell на момент миграции: миграции не импортируют код приложения.
+CELL_SIZE = 0.01
+LON_CELLS = int(round(360 / CELL_SIZE))
+
+
+def grid_cell(latitude, longitude):
+    half = LON_CELLS // 2
+    return math.floor(latitude / CELL_SIZE), (math.floor(longitude / CELL_SIZE) + half) % LON_CELLS - half
+
+
+def fill_grid_cells(apps, schema_editor):
+    CollectibleItem = apps.get_model('app_run', 'CollectibleItem')
+    items = list(CollectibleItem.objects.only('id', 'latitude', 'longitude'))
+    for item in items:
+        item.cell_lat, item.cell_lon = grid_cell(item.latitude, item.longitude)
+    CollectibleItem.objects.bulk_update(items, ['cell_lat', 'cell_lon'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0026_alter_position_date_time'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectibleitem',
+            name='cell_lat',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='collectibleitem',
+            name='cell_lon',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='collectibleitem',
+            index=models.Index(fields=['cell_lat', 'cell_lon'], name='app_run_col_cell_la_2c837f_idx'),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2 on 2026-10-18 09:30
+
+import math
+
+from django.db import migrations, models
+
+# Копия app_run.track.track_length_km (формула Ламберта для WGS-84) на момент миграции без numpy:
+# миграции не импортируют код приложения.
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    return 2 * math.asin(math.sqrt(
+        math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2))
+
+
+def _lambert(lat1, lon1, lat2, lon2):
+    beta1 = math.atan((1 - WGS84_F) * math.tan(lat1))
+    beta2 = math.atan((1 - WGS84_F) * math.tan(lat2))
+    sigma = _haversine(beta1, lon1, beta2, lon2)
+    if sigma == 0:
+        return 0.0
+
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+    x = (sigma - math.sin(sigma)) * math.sin(p) ** 2 * math.cos(q) ** 2 / math.cos(sigma / 2) ** 2
+    y = (sigma + math.sin(sigma)) * math.cos(p) ** 2 * math.sin(q) ** 2 / math.sin(sigma / 2) ** 2
+    return WGS84_A * (sigma - WGS84_F / 2 * (x + y))
+
+
+def track_length_km(points):
+    radians = [(math.radians(latitude), math.radians(longitude)) for latitude, longitude in points]
+    return sum(_lambert(*start, *end) for start, end in zip(radians, radians[1:])) / 1000
+
+
+def fill_track_totals(apps, schema_editor):
+    # Итоги нужны только незавершённым забегам; завершённые пересчитываются командой rebuild_run_totals.
+    Run = apps.get_model('app_run', 'Run')
+    Position = apps.get_model('app_run', 'Position')
+    for run in Run.objects.filter(status='in_progress'):
+        points = list(Position.objects.filter(run_id=run.id).order_by('id').values_list(
+            'latitude', 'longitude', 'date_time'))
+        if not points:
+            continue
+        times = [date_time for _, _, date_time in points if date_time is not None]
+        run.track_distance = track_length_km([(latitude, longitude) for latitude, longitude, _ in points])
+        run.positions_count = len(points)
+        run.last_latitude, run.last_longitude = points[-1][:2]
+        run.min_date_time = min(times) if times else None
+        run.max_date_time = max(times) if times else None
+        run.save(update_fields=['track_distance', 'positions_count', 'last_latitude', 'last_longitude',
+                                'min_date_time', 'max_date_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0027_collectibleitem_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='last_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='last_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='max_date_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='min_date_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='positions_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='track_distance',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_track_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 09:33
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0028_run_track_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='pending', max_length=255)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file', models.BinaryField(blank=True, default=b'')),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('inserted', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('invalid', models.IntegerField(default=0)),
+                ('invalid_rows', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+        ),
+    ]
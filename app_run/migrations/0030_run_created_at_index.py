@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0029_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='run',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 09:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0030_run_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tolerance', models.FloatField(default=0)),
+                ('polyline', models.TextField()),
+                ('points_count', models.IntegerField()),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('time_deltas', models.JSONField(blank=True, default=list)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracks', to='app_run.run')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'tolerance'), name='unique_run_track_tolerance')],
+            },
+        ),
+    ]
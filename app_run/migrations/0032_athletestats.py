@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Max
+
+
+def fill_athlete_stats(apps, schema_editor):
+    Run = apps.get_model('app_run', 'Run')
+    AthleteStats = apps.get_model('app_run', 'AthleteStats')
+    rows = Run.objects.filter(status='finished').values('athlete_id').annotate(
+        finished_runs=Count('id'), total_distance=Sum('distance'), total_time_seconds=Sum('run_time_seconds'),
+        longest_run_distance=Max('distance'), last_run_at=Max('created_at')).order_by()
+    AthleteStats.objects.bulk_create(
+        [AthleteStats(user_id=row['athlete_id'], finished_runs=row['finished_runs'],
+                      total_distance=row['total_distance'] or 0, total_time_seconds=row['total_time_seconds'] or 0,
+                      longest_run_distance=row['longest_run_distance'] or 0, last_run_at=row['last_run_at'])
+         for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0031_runtrack'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AthleteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finished_runs', models.IntegerField(default=0)),
+                ('total_distance', models.FloatField(default=0)),
+                ('total_time_seconds', models.IntegerField(default=0)),
+                ('longest_run_distance', models.FloatField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_athlete_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 09:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+# Челленджи, которые раньше выдавались по совпадению full_name.
+RULE_NAMES = {
+    'runs_10': 'Сделай 10 Забегов!',
+    'distance_50': 'Пробеги 50 километров!',
+}
+
+
+def fill_rules(apps, schema_editor):
+    Challenge = apps.get_model('app_run', 'Challenge')
+    for rule, full_name in RULE_NAMES.items():
+        # Дубликаты остаются без кода правила, иначе не создать уникальное ограничение.
+        first_ids = Challenge.objects.filter(full_name=full_name).values('athlete_id').annotate(
+            first_id=Min('id')).values_list('first_id', flat=True)
+        Challenge.objects.filter(id__in=list(first_ids)).update(rule=rule)
+
+
+def fill_items_collected(apps, schema_editor):
+    AthleteStats = apps.get_model('app_run', 'AthleteStats')
+    CollectibleItem = apps.get_model('app_run', 'CollectibleItem')
+    counts = CollectibleItem.collected_by.through.objects.values('user_id').annotate(count=Count('id')).order_by()
+    for row in counts:
+        AthleteStats.objects.filter(user_id=row['user_id']).update(items_collected=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0032_athletestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='athletestats',
+            name='items_collected',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='rule',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(fill_items_collected, migrations.RunPython.noop),
+        migrations.RunPython(fill_rules, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='challenge',
+            constraint=models.UniqueConstraint(fields=('athlete', 'rule'), name='unique_athlete_challenge_rule'),
+        ),
+    ]
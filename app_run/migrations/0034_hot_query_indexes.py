@@ -0,0 +1,111 @@
+# Generated by Django 5.2 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Точки трека по забегу. INCLUDE есть только в PostgreSQL: там индекс покрывающий,
+# в остальных БД обычный (run_id, id), как и в состоянии модели.
+POSITION_RUN_INDEX = 'position_run_id_idx'
+
+
+def _position_run_index(schema_editor):
+    include = ['latitude', 'longitude', 'date_time'] if schema_editor.connection.vendor == 'postgresql' else []
+    return models.Index(fields=['run', 'id'], include=include, name=POSITION_RUN_INDEX)
+
+
+def create_position_run_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('app_run', 'Position'), _position_run_index(schema_editor))
+
+
+def drop_position_run_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('app_run', 'Position'), _position_run_index(schema_editor))
+
+
+# Индексы на auth_user: своей модели пользователя нет, поэтому через SQL.
+# Список пользователей сортируется по date_joined.
+USER_DATE_JOINED_INDEX = 'auth_user_date_joined_idx'
+# Поиск SearchFilter по first_name/last_name — это UPPER(...) LIKE '%...%'; B-tree тут бесполезен,
+# на PostgreSQL помогает триграммный GIN-индекс по тому же выражению.
+USER_TRIGRAM_INDEXES = {
+    'auth_user_first_name_trgm_idx': 'first_name',
+    'auth_user_last_name_trgm_idx': 'last_name',
+}
+
+
+def create_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in USER_TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON auth_user USING gin ((UPPER({column}::text)) gin_trgm_ops)')
+
+
+def drop_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in USER_TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0033_challenge_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # На SQLite AlterField пересоздаёт таблицу и теряет индексы, о которых Django не знает,
+        # поэтому индексы auth_user создаются после последней миграции auth.
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='challenge',
+            index=models.Index(fields=['athlete', 'full_name'], name='challenge_athlete_name_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='position',
+                    index=models.Index(fields=['run', 'id'], name=POSITION_RUN_INDEX),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_position_run_index, drop_position_run_index),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='position',
+            index=models.Index(fields=['run', 'date_time'], name='position_run_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='run',
+            index=models.Index(fields=['athlete', 'status'], name='run_athlete_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='run',
+            index=models.Index(condition=models.Q(('status', 'finished')), fields=['athlete', 'created_at'], name='run_finished_athlete_idx'),
+        ),
+        # Одиночные индексы по FK удаляются после создания составных, которые их заменяют.
+        migrations.AlterField(
+            model_name='challenge',
+            name='athlete',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='challenges', to='app_run.athleteinfo'),
+        ),
+        migrations.AlterField(
+            model_name='position',
+            name='run',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='app_run.run'),
+        ),
+        migrations.AlterField(
+            model_name='run',
+            name='athlete',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='runs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunSQL(
+            f'CREATE INDEX IF NOT EXISTS {USER_DATE_JOINED_INDEX} ON auth_user (date_joined)',
+            f'DROP INDEX IF EXISTS {USER_DATE_JOINED_INDEX}',
+        ),
+        migrations.RunPython(create_user_search_indexes, drop_user_search_indexes),
+    ]
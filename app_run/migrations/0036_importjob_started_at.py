@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0035_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,28 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction, connections, router
+from django.db.models import Count, Sum, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from app_run.geo import grid_cell
+
+
+class RunManager(models.Manager):
+    def transition(self, run_id, from_status, to_status):
+        """Условный UPDATE ... WHERE status = from_status. Возвращает обновлённый забег или None."""
+        connection = connections[router.db_for_write(self.model)]
+        if connection.vendor == 'postgresql' or (
+                connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert):
+            qn = connection.ops.quote_name
+            sql = (f'UPDATE {qn(self.model._meta.db_table)} SET {qn("status")} = %s, {qn("updated_at")} = %s '
+                   f'WHERE {qn("id")} = %s AND {qn("status")} = %s RETURNING *')
+            params = [to_status, connection.ops.adapt_datetimefield_value(timezone.now()), run_id, from_status]
+            return next(iter(self.raw(sql, params).using(connection.alias)), None)
+
+        if not self.filter(id=run_id, status=from_status).update(status=to_status, updated_at=timezone.now()):
+            return None
+        return self.get(id=run_id)
 
 
 class Run(models.Model):
@@ -9,16 +32,119 @@ class Run(models.Model):
         ('finished', 'Finished'),
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    athlete = models.ForeignKey(User, on_delete=models.CASCADE, related_name='runs')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Для ETag/Last-Modified; запросы queryset.update() выставляют его явно.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Отдельный индекс по athlete не нужен: его покрывают составные индексы из Meta.
+    athlete = models.ForeignKey(User, on_delete=models.CASCADE, related_name='runs', db_index=False)
     comment = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=255, choices=STATUS_CHOICES, default='init')
     distance = models.FloatField(blank=True, null=True)
     run_time_seconds = models.IntegerField(blank=True, null=True)
 
+    # Накопительные значения по трекам, обновляются при каждой записи Position.
+    track_distance = models.FloatField(default=0)
+    positions_count = models.IntegerField(default=0)
+    min_date_time = models.DateTimeField(blank=True, null=True)
+    max_date_time = models.DateTimeField(blank=True, null=True)
+    last_latitude = models.FloatField(blank=True, null=True)
+    last_longitude = models.FloatField(blank=True, null=True)
+
+    objects = RunManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['athlete', 'status'], name='run_athlete_status_idx'),
+            # Итоги атлета и челленджи считаются только по завершённым забегам.
+            models.Index(fields=['athlete', 'created_at'], condition=models.Q(status='finished'),
+                         name='run_finished_athlete_idx'),
+        ]
+
+    TRACK_FIELDS = ['track_distance', 'positions_count', 'min_date_time', 'max_date_time', 'last_latitude',
+                    'last_longitude']
+
+    # Поля, от которых зависит AthleteStats.
+    STATS_FIELDS = ['athlete_id', 'status', 'distance', 'run_time_seconds']
+
     def __str__(self):
         return f'Id:{self.id} athlete: {self.athlete} athlete_id: {self.athlete.id} {self.status}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.STATS_FIELDS):
+            instance._stats_state = instance.stats_state()
+        return instance
+
+    def stats_state(self):
+        return tuple(getattr(self, field) for field in self.STATS_FIELDS)
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        previous = None if self._state.adding else getattr(self, '_stats_state', False)
+        current = self.stats_state()
+        update_fields = kwargs.get('update_fields')
+        touches_stats = update_fields is None or bool(
+            {'athlete', 'athlete_id', 'status', 'distance', 'run_time_seconds'} & set(update_fields))
+
+        if not touches_stats or previous == current or (
+                previous is not False and 'finished' not in (current[1], previous and previous[1])):
+            super().save(*args, **kwargs)
+            if touches_stats:
+                self._stats_state = current
+            return
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._stats_state = current
+            if previous is None or (previous and previous[1] != 'finished'):
+                # Забег только что завершён: итоги обновляются без пересчёта по всей истории.
+                AthleteStats.add_run(self)
+            else:
+                # Правка завершённого забега или состояние до сохранения неизвестно.
+                for athlete_id in {previous[0] if previous else current[0], current[0]}:
+                    AthleteStats.rebuild(athlete_id)
+
+    def extend_track(self, points):
+        """Добавляет к итогам точки (latitude, longitude, date_time) в порядке их записи."""
+        if not points:
+            return
+        coordinates = [(latitude, longitude) for latitude, longitude, _ in points]
+        if self.last_latitude is not None:
+            coordinates.insert(0, (self.last_latitude, self.last_longitude))
+
+        from app_run.track import track_length_km  # numpy грузится только при записи трека.
+
+        self.track_distance += track_length_km(coordinates)
+        self.positions_count += len(points)
+        self.last_latitude, self.last_longitude = coordinates[-1]
+
+        times = [date_time for _, _, date_time in points if date_time is not None]
+        if times:
+            self.min_date_time = min(times + ([self.min_date_time] if self.min_date_time else []))
+            self.max_date_time = max(times + ([self.max_date_time] if self.max_date_time else []))
+
+        self.save(update_fields=self.TRACK_FIELDS)
+
+    def reset_track(self):
+        self.track_distance = 0
+        self.positions_count = 0
+        self.min_date_time = self.max_date_time = None
+        self.last_latitude = self.last_longitude = None
+
+    def rebuild_track(self):
+        self.reset_track()
+        points = list(self.positions.order_by('id').values_list('latitude', 'longitude', 'date_time'))
+        if points:
+            self.extend_track(points)
+        else:
+            self.save(update_fields=self.TRACK_FIELDS)
+
+    @classmethod
+    def locked(cls, run_id):
+        return cls.objects.select_for_update().get(pk=run_id)
+
 class AthleteInfo(models.Model):
     goals = models.CharField(max_length=255)
     weight = models.IntegerField(blank=True, null=True)
@@ -27,22 +153,133 @@ class AthleteInfo(models.Model):
     def __str__(self):
         return f'user:{self.user}'
 
+class AthleteStats(models.Model):
+    """Итоги по завершённым забегам атлета; обновляются при завершении, правке и удалении забега."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    finished_runs = models.IntegerField(default=0)
+    total_distance = models.FloatField(default=0)
+    total_time_seconds = models.IntegerField(default=0)
+    longest_run_distance = models.FloatField(default=0)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    items_collected = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'user:{self.user_id} runs:{self.finished_runs} distance:{self.total_distance}'
+
+    @staticmethod
+    def calculate(user_id):
+        """Итоги по завершённым забегам, посчитанные заново запросом к Run."""
+        values = Run.objects.filter(athlete_id=user_id, status='finished').aggregate(
+            finished_runs=Count('id'), total_distance=Sum('distance'), total_time_seconds=Sum('run_time_seconds'),
+            longest_run_distance=Max('distance'), last_run_at=Max('created_at'))
+        for field in ('total_distance', 'total_time_seconds', 'longest_run_distance'):
+            values[field] = values[field] or 0
+        values['items_collected'] = CollectibleItem.collected_by.through.objects.filter(user_id=user_id).count()
+        return values
+
+    @classmethod
+    def rebuild(cls, user_id):
+        stats, _ = cls.objects.update_or_create(user_id=user_id, defaults=cls.calculate(user_id))
+        return stats
+
+    @classmethod
+    def refresh(cls, user_id):
+        """Пересчёт без создания записи: вызывается и при каскадном удалении пользователя."""
+        cls.objects.filter(user_id=user_id).update(**cls.calculate(user_id), updated_at=timezone.now())
+
+    @classmethod
+    def refresh_items(cls, user_ids):
+        collected = CollectibleItem.collected_by.through.objects.filter(user_id=OuterRef('user_id')).values(
+            'user_id').annotate(count=Count('id')).values('count')
+        cls.objects.filter(user_id__in=user_ids).update(items_collected=Coalesce(Subquery(collected), 0),
+                                                        updated_at=timezone.now())
+
+    @classmethod
+    def add_run(cls, run):
+        """Учитывает только что завершённый забег."""
+        with transaction.atomic(savepoint=False):
+            stats = cls.objects.select_for_update().filter(user_id=run.athlete_id).first()
+            if stats is None:
+                return cls.rebuild(run.athlete_id)
+            stats.finished_runs += 1
+            stats.total_distance += run.distance or 0
+            stats.total_time_seconds += run.run_time_seconds or 0
+            stats.longest_run_distance = max(stats.longest_run_distance, run.distance or 0)
+            if stats.last_run_at is None or run.created_at > stats.last_run_at:
+                stats.last_run_at = run.created_at
+            stats.save()
+        return stats
+
 class Challenge(models.Model):
     full_name = models.CharField(max_length=255)
-    athlete = models.ForeignKey(AthleteInfo, on_delete=models.CASCADE, related_name='challenges')
+    athlete = models.ForeignKey(AthleteInfo, on_delete=models.CASCADE, related_name='challenges', db_index=False)
+    # Код правила из app_run.challenges; у челленджей, выданных вручную, пустой.
+    rule = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['athlete', 'rule'], name='unique_athlete_challenge_rule'),
+        ]
+        indexes = [
+            models.Index(fields=['athlete', 'full_name'], name='challenge_athlete_name_idx'),
+        ]
 
     def __str__(self):
         return f'full_name:{self.full_name}, athlete:{self.athlete}'
 
 class Position(models.Model):
-    run = models.ForeignKey(Run, on_delete=models.CASCADE, related_name='positions')
+    run = models.ForeignKey(Run, on_delete=models.CASCADE, related_name='positions', db_index=False)
     latitude = models.FloatField()
     longitude = models.FloatField()
     date_time = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Точки трека в порядке записи. На PostgreSQL миграция 0034 создаёт его покрывающим
+            # (INCLUDE latitude, longitude, date_time — index-only scan); SQLite INCLUDE не поддерживает.
+            models.Index(fields=['run', 'id'], name='position_run_id_idx'),
+            # MIN/MAX времени по забегу.
+            models.Index(fields=['run', 'date_time'], name='position_run_date_time_idx'),
+        ]
+
     def __str__(self):
         return f'run:{self.run}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'run_id' in field_names:
+            instance._loaded_run_id = instance.run_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            run_ids = {self.run_id}
+            if not adding:
+                # Точку могли перенести в другой забег: итоги пересчитываются у обоих.
+                previous = getattr(self, '_loaded_run_id', None) or Position.objects.filter(
+                    pk=self.pk).values_list('run_id', flat=True).first()
+                run_ids.add(previous or self.run_id)
+            # Забеги блокируются до записи точки (по возрастанию id, без взаимных блокировок),
+            # поэтому точки одного забега попадают в итоги в порядке их id.
+            runs = [Run.locked(run_id) for run_id in sorted(run_ids)]
+            super().save(*args, **kwargs)
+            self._loaded_run_id = self.run_id
+            if adding:
+                runs[0].extend_track([(self.latitude, self.longitude, self.date_time)])
+            else:
+                for run in runs:
+                    run.rebuild_track()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            run = Run.locked(self.run_id)
+            result = super().delete(*args, **kwargs)
+            run.rebuild_track()
+        return result
+
 class CollectibleItem(models.Model):
     name = models.CharField(max_length=255)
     uid = models.CharField(max_length=255, unique=True)
@@ -50,4 +287,121 @@ class CollectibleItem(models.Model):
     longitude = models.FloatField()
     picture = models.URLField()
     value = models.IntegerField()
-    collected_by = models.ManyToManyField(User, related_name='collectible_items', blank=True)
\ No newline at end of file
+    collected_by = models.ManyToManyField(User, related_name='collectible_items', blank=True)
+    cell_lat = models.IntegerField(default=0, editable=False)
+    cell_lon = models.IntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cell_lat', 'cell_lon']),
+        ]
+
+    def update_cell(self):
+        self.cell_lat, self.cell_lon = grid_cell(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.update_cell()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'cell_lat', 'cell_lon', 'updated_at'}
+        super().save(*args, **kwargs)
+
+
+class RunTrack(models.Model):
+    """Сжатое представление трека забега (encoded polyline). Для завершённых забегов хранится в БД."""
+    run = models.ForeignKey(Run, on_delete=models.CASCADE, related_name='tracks')
+    tolerance = models.FloatField(default=0)  # Метры; 0 — полный трек без упрощения.
+    polyline = models.TextField()
+    points_count = models.IntegerField()
+    start_time = models.DateTimeField(blank=True, null=True)
+    # Разница времени с предыдущей точкой, мс; None — у точки нет времени.
+    time_deltas = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'tolerance'], name='unique_run_track_tolerance'),
+        ]
+
+    def __str__(self):
+        return f'run:{self.run_id} tolerance:{self.tolerance}'
+
+    # Допуск упрощения (м) для масштабов карты: примерно пиксель на минимальном зуме уровня.
+    ZOOM_TOLERANCES = {10: 100.0, 12: 25.0, 14: 6.0, 16: 1.5}
+    FULL_TRACK_ZOOM = 17
+
+    @classmethod
+    def tolerance_for_zoom(cls, zoom):
+        if zoom >= cls.FULL_TRACK_ZOOM:
+            return 0
+        levels = [level for level in cls.ZOOM_TOLERANCES if level <= zoom]
+        return cls.ZOOM_TOLERANCES[max(levels) if levels else min(cls.ZOOM_TOLERANCES)]
+
+    @classmethod
+    def build(cls, run, tolerance=0, rows=None):
+        from app_run import polyline
+        from app_run.track import simplify
+
+        if rows is None:
+            rows = list(run.positions.order_by('id').values_list('latitude', 'longitude', 'date_time'))
+        if tolerance and rows:
+            indexes = simplify([row[0] for row in rows], [row[1] for row in rows], tolerance)
+            rows = [rows[index] for index in indexes.tolist()]
+        start_time = next((date_time for _, _, date_time in rows if date_time is not None), None)
+
+        time_deltas = []
+        previous = start_time
+        for _, _, date_time in rows:
+            if date_time is None:
+                time_deltas.append(None)
+                continue
+            time_deltas.append(round((date_time - previous).total_seconds() * 1000))
+            previous = date_time
+
+        return cls(run=run, tolerance=tolerance, points_count=len(rows), start_time=start_time,
+                   time_deltas=time_deltas,
+                   polyline=polyline.encode([(latitude, longitude) for latitude, longitude, _ in rows]))
+
+    @classmethod
+    def store_for_run(cls, run):
+        """Сохраняет полный трек и упрощённые версии для всех уровней масштаба."""
+        rows = list(run.positions.order_by('id').values_list('latitude', 'longitude', 'date_time'))
+        tracks = [cls.build(run, tolerance, rows) for tolerance in [0, *cls.ZOOM_TOLERANCES.values()]]
+        cls.objects.bulk_create(tracks, ignore_conflicts=True)
+
+    @classmethod
+    def for_run(cls, run, tolerance=0):
+        """Трек забега; у завершённого вычисляется один раз и сохраняется."""
+        if run.status != 'finished':
+            return cls.build(run, tolerance)
+        track = cls.objects.filter(run=run, tolerance=tolerance).first()
+        if track is None:
+            track = cls.build(run, tolerance)
+            cls.objects.bulk_create([track], ignore_conflicts=True)
+        return track
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('finished', 'Finished'),
+        ('failed', 'Failed'),
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Когда задачу захватил воркер; по нему находятся задачи, чей процесс умер (app_run.jobs).
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    status = models.CharField(max_length=255, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255)
+    # Содержимое файла хранится до обработки: очередь живёт в БД и не требует брокера.
+    file = models.BinaryField(blank=True, default=b'')
+    rows_processed = models.IntegerField(default=0)
+    inserted = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    invalid = models.IntegerField(default=0)
+    invalid_rows = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return f'Id:{self.id} {self.file_name} {self.status}'
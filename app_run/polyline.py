@@ -0,0 +1,32 @@
+"""Google Encoded Polyline Algorithm Format."""
+import numpy as np
+
+
+def encode(points, precision=5):
+    if len(points) == 0:
+        return ''
+    values = np.floor(np.asarray(points, dtype=float) * 10 ** precision + 0.5).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    chunks = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def decode(encoded, precision=5):
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    coordinates = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return [tuple(point) for point in coordinates.tolist()]
@@ -0,0 +1,134 @@
+"""Кэш ответов GET-эндпоинтов на кэше Django (RESPONSE_CACHE_ALIAS).
+
+Ключ ответа — эндпоинт, путь, параметры запроса и текущие версии его пространств имён
+(ITEMS, CHALLENGES, user_namespace(id)). invalidate() меняет версию пространства,
+и все ответы, которые от него зависят, перестают находиться; старые записи истекают по таймауту.
+Инвалидацию вызывают сигналы (app_run.signals) и код, который пишет в обход сигналов
+(bulk_create, queryset.update).
+При промахе представление читает из основной базы: с реплики можно прочитать данные до записи,
+которая только что сменила версию, и закэшировать их под новым ключом.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from app_run.routers import read_from_replica
+
+ITEMS = 'items'
+CHALLENGES = 'challenges'
+
+# Эндпоинты, для которых считаются попадания и промахи.
+ENDPOINTS = []
+
+
+def user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'response-cache:version:{namespace}'
+
+
+def _counter_key(endpoint, kind):
+    return f'response-cache:{kind}:{endpoint}'
+
+
+def versions(namespaces):
+    cache = get_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+    return [found.get(key) or missing[key] for key in keys]
+
+
+def _bump(namespaces):
+    get_cache().set_many({_version_key(namespace): uuid.uuid4().hex for namespace in namespaces}, None)
+
+
+def invalidate(*namespaces):
+    # Выключенный кэш не читается, и версии в нём менять незачем (с DatabaseCache это лишние запросы).
+    if not namespaces or not settings.RESPONSE_CACHE_ENABLED:
+        return
+    _bump(namespaces)
+    # Читатель мог закэшировать старые данные, пока транзакция писателя не была зафиксирована.
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def _count(endpoint, kind):
+    cache = get_cache()
+    key = _counter_key(endpoint, kind)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен между add и incr.
+        cache.set(key, 1, None)
+
+
+def stats():
+    cache = get_cache()
+    values = cache.get_many([_counter_key(endpoint, kind) for endpoint in ENDPOINTS for kind in ('hits', 'misses')])
+    return {endpoint: {kind: values.get(_counter_key(endpoint, kind), 0) for kind in ('hits', 'misses')}
+            for endpoint in ENDPOINTS}
+
+
+def reset_stats():
+    get_cache().delete_many([_counter_key(endpoint, kind) for endpoint in ENDPOINTS for kind in ('hits', 'misses')])
+
+
+def cached_response(*namespaces):
+    """Кэширует response.data DRF-представления с ответом 200: функции (request, ...) или метода (self, request, ...).
+
+    В пространствах имён можно подставлять аргументы URL: user_namespace('{pk}').
+    Заголовок X-Cache: HIT или MISS.
+    """
+
+    def decorator(method):
+        endpoint = method.__qualname__
+        ENDPOINTS.append(endpoint)
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return method(*args, **kwargs)
+            request = args[0] if isinstance(args[0], Request) else args[1]
+
+            resolved = [namespace.format(**kwargs) for namespace in namespaces]
+            params = urlencode(sorted(request.query_params.lists()), doseq=True)
+            raw_key = '|'.join([endpoint, request.path, params, *versions(resolved)])
+            key = f'response-cache:{hashlib.md5(raw_key.encode()).hexdigest()}'
+
+            cache = get_cache()
+            data = cache.get(key)
+            if data is not None:
+                _count(endpoint, 'hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count(endpoint, 'misses')
+            with read_from_replica(False):
+                response = method(*args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,42 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# По умолчанию (команды, shell, небезопасные запросы) всё идёт в основную базу;
+# реплики включает ReplicaMiddleware только для безопасных запросов.
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """Чтение — со случайной реплики из DATABASE_REPLICAS, запись и миграции — только в default."""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and _read_from_replica.get():
+            return random.choice(aliases)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
@@ -1,9 +1,10 @@
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import serializers, status
 from rest_framework.response import Response
 
-from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, ImportJob, RunTrack
 
 
 class UserRunSerializer(serializers.ModelSerializer):
@@ -20,6 +21,17 @@ class RunSerializer(serializers.ModelSerializer):
         fields = ('id', 'athlete', 'comment', 'created_at', 'athlete_data', 'status', 'distance', 'run_time_seconds')
 
 
+class RunTrackSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RunTrack
+        fields = ('run', 'tolerance', 'points_count', 'polyline')
+
+
+class RunTrackTimestampsSerializer(RunTrackSerializer):
+    class Meta(RunTrackSerializer.Meta):
+        fields = RunTrackSerializer.Meta.fields + ('start_time', 'time_deltas')
+
+
 class UserSerializer(serializers.ModelSerializer):
     type = serializers.SerializerMethodField(read_only=True)
     runs_finished = serializers.SerializerMethodField(read_only=True)
@@ -32,7 +44,8 @@ class UserSerializer(serializers.ModelSerializer):
         return 'coach' if instance.is_staff else 'athlete'
 
     def get_runs_finished(self, instance):
-        return instance.runs.filter(status='finished').count()
+        stats = getattr(instance, 'stats', None)
+        return stats.finished_runs if stats else 0
 
 
 class CollectibleItemSerializer(serializers.ModelSerializer):
@@ -41,6 +54,12 @@ class CollectibleItemSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'uid', 'latitude', 'longitude', 'picture', 'value')
 
 
+class CollectibleItemImportSerializer(CollectibleItemSerializer):
+    # Уникальность uid при импорте проверяется пачкой, а не запросом на каждую строку.
+    class Meta(CollectibleItemSerializer.Meta):
+        extra_kwargs = {'uid': {'validators': []}}
+
+
 class UserCollectibleItemsSerializer(UserSerializer):
     items = CollectibleItemSerializer(many=True, source='collectible_items')
 
@@ -82,3 +101,41 @@ class PositionSerializer(serializers.ModelSerializer):
         if not (-180 <= value <= 180):
             raise serializers.ValidationError('Longitude must be between -180 and 180!')
         return round(value, 4)
+
+
+class PositionRowSerializer:
+    """Сериализация строк values_list для потоковой выдачи; формат совпадает с PositionSerializer."""
+    fields = ('id', 'run', 'latitude', 'longitude', 'date_time')
+    values = ('id', 'run_id', 'latitude', 'longitude', 'date_time')
+    date_time_format = '%Y-%m-%dT%H:%M:%S.%f'
+
+    @classmethod
+    def to_representation(cls, row):
+        data = dict(zip(cls.fields, row))
+        if data['date_time'] is not None:
+            data['date_time'] = timezone.localtime(data['date_time']).strftime(cls.date_time_format)
+        return data
+
+
+class PositionBatchItemSerializer(PositionSerializer):
+    class Meta(PositionSerializer.Meta):
+        fields = ('latitude', 'longitude', 'date_time')
+
+
+class PositionBatchSerializer(serializers.Serializer):
+    MAX_POSITIONS = 500
+
+    run = serializers.PrimaryKeyRelatedField(queryset=Run.objects.select_related('athlete'))
+    positions = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_POSITIONS)
+
+    def validate_run(self, value):
+        if value.status != 'in_progress':
+            raise serializers.ValidationError('Status run must be in_progress')
+        return value
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = ('id', 'status', 'file_name', 'created_at', 'started_at', 'finished_at', 'rows_processed', 'inserted',
+                  'skipped', 'invalid', 'invalid_rows', 'error')
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from app_run.models import Run, AthleteStats, CollectibleItem, Challenge, AthleteInfo
+from app_run.response_cache import invalidate, user_namespace, ITEMS, CHALLENGES
+
+
+@receiver(post_delete, sender=Run)
+def update_stats_on_run_delete(sender, instance, **kwargs):
+    if instance.status == 'finished':
+        AthleteStats.refresh(instance.athlete_id)
+
+
+@receiver(m2m_changed, sender=CollectibleItem.collected_by.through)
+def update_stats_on_items_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse — изменение со стороны пользователя (user.collectible_items).
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_user_ids = list(instance.collected_by.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = instance.__dict__.pop('_cleared_user_ids', [])
+    else:
+        user_ids = pk_set
+    if user_ids:
+        AthleteStats.refresh_items(user_ids)
+        invalidate(*[user_namespace(user_id) for user_id in user_ids])
+
+
+# Кэш ответов (app_run.response_cache): записи в обход сигналов инвалидируются там, где они делаются.
+@receiver([post_save, post_delete], sender=CollectibleItem)
+def invalidate_items(sender, **kwargs):
+    invalidate(ITEMS)
+
+
+@receiver([post_save, post_delete], sender=Challenge)
+def invalidate_challenges(sender, **kwargs):
+    invalidate(CHALLENGES)
+
+
+@receiver([post_save, post_delete], sender=Run)
+@receiver([post_save, post_delete], sender=AthleteInfo)
+def invalidate_athlete(sender, instance, update_fields=None, **kwargs):
+    # Итоги трека (extend_track на каждую точку) в кэшируемые ответы не входят.
+    if sender is Run and update_fields and set(update_fields) <= {*Run.TRACK_FIELDS, 'updated_at'}:
+        return
+    invalidate(user_namespace(instance.athlete_id if sender is Run else instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate(user_namespace(instance.pk))
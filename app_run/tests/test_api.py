@@ -1,10 +1,24 @@
+from datetime import datetime, timedelta, timezone
+import json
+from io import StringIO, BytesIO
+from threading import Barrier, Thread
+from unittest.mock import patch
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import override_settings, TransactionTestCase
 from django.urls import reverse
 from geopy.distance import geodesic, distance
+from openpyxl import Workbook
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient
 
-from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, ImportJob, RunTrack, \
+    AthleteStats
+from app_run.polyline import decode
 from app_run.serializers import RunSerializer, UserSerializer, AthleteInfoSerializer, ChallengeSerializer, \
     PositionSerializer, UserCollectibleItemsSerializer
 
@@ -243,6 +257,46 @@ class UserApiTestCase(APITestCase):
         self.assertEqual(serializer_data, response.data)
 
 
+
+class UserQueriesTestCase(APITestCase):
+    def create_users(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create(username=f'user_{i}')
+            Run.objects.create(athlete=user, status='finished')
+            Run.objects.create(athlete=user, status='init')
+            item = CollectibleItem.objects.create(name='chocolate', uid=f'uid_{i}', latitude=76.21, longitude=32.21,
+                                                  value=1, picture='www.google.com')
+            user.collectible_items.add(item)
+
+    def test_list_queries(self):
+        url = reverse('api-users-list')
+        for count in (1, 20):
+            self.create_users(count)
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertTrue(all(user['runs_finished'] == 1 for user in response.data))
+
+    def test_list_paginated_queries(self):
+        self.create_users(20)
+        url = reverse('api-users-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'size': 10})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_retrieve_queries(self):
+        self.create_users(3)
+        user = User.objects.get(username='user_1')
+        url = reverse('api-users-detail', args=(user.id,))
+        # Третий запрос — состояние для ETag (app_run.conditional).
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(response.data['runs_finished'], 1)
+        self.assertEqual(len(response.data['items']), 1)
+
 class AthleteInfoTestCase(APITestCase):
     def setUp(self):
         self.superuser = User.objects.create_superuser(username='Admin', is_superuser=True, is_staff=True)
@@ -493,3 +547,609 @@ class PositionTestCase(APITestCase):
         collected_ids_after = set(self.athlete_1.collectible_items.values_list('id', flat=True))
 
         self.assertEqual(collected_ids_before, collected_ids_after)
+
+
+class PositionBatchTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        self.run_2 = Run.objects.create(athlete=self.athlete_1, status='finished')
+
+        self.collectible_item_1 = CollectibleItem.objects.create(name='chocolate', uid='123', latitude=76.21,
+                                                                 longitude=32.21, value=1, picture='www.google.com')
+        self.collectible_item_2 = CollectibleItem.objects.create(name='apple', uid='456', latitude=76.2,
+                                                                 longitude=32.0, value=1, picture='www.google.com')
+
+    def test_create_batch(self):
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_1.id,
+            'positions': [
+                {'latitude': 76.20991, 'longitude': 32.2099, 'date_time': '2025-01-01T10:00:00.000000'},
+                {'latitude': 76.21001, 'longitude': 32.21, 'date_time': '2025-01-01T10:00:05.000000'},
+            ]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        positions = list(Position.objects.filter(run=self.run_1).order_by('id'))
+        self.assertEqual([position.id for position in positions], response.data['ids'])
+        self.assertEqual([(76.2099, 32.2099), (76.21, 32.21)],
+                         [(position.latitude, position.longitude) for position in positions])
+        self.assertEqual([self.collectible_item_1], list(self.athlete_1.collectible_items.all()))
+
+    def test_create_batch_pickup_queries(self):
+        self.athlete_1.collectible_items.add(self.collectible_item_2)
+        item_3 = CollectibleItem.objects.create(name='pear', uid='789', latitude=76.2101, longitude=32.2101, value=1,
+                                                picture='www.google.com')
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_1.id,
+            'positions': [{'latitude': 76.2, 'longitude': 32.0, 'date_time': '2025-01-01T10:00:00.000000'},
+                          {'latitude': 76.21, 'longitude': 32.21, 'date_time': '2025-01-01T10:00:05.000000'}]
+        }
+        # Кандидаты без уже собранных, вставка в связующую таблицу и обновление итогов — по одному запросу.
+        with self.assertNumQueries(9):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual({self.collectible_item_1, self.collectible_item_2, item_3},
+                         set(self.athlete_1.collectible_items.all()))
+        self.assertEqual(AthleteStats.objects.get(user=self.athlete_1).items_collected, 3)
+
+    def test_create_batch_item_errors(self):
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_1.id,
+            'positions': [
+                {'latitude': 10, 'longitude': 10, 'date_time': '2025-01-01T10:00:00.000000'},
+                {'latitude': -95, 'longitude': 10, 'date_time': '2025-01-01T10:00:01.000000'},
+                {'latitude': 10, 'longitude': 400, 'date_time': '2025-01-01T10:00:02.000000'},
+            ]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual([1, 2], [error['index'] for error in response.data['errors']])
+        self.assertIn('latitude', response.data['errors'][0]['errors'])
+        self.assertIn('longitude', response.data['errors'][1]['errors'])
+        self.assertEqual(Position.objects.count(), 0)
+
+    def test_create_batch_run_not_in_progress(self):
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_2.id,
+            'positions': [{'latitude': 10, 'longitude': 10, 'date_time': '2025-01-01T10:00:00.000000'}]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('run', response.data)
+        self.assertEqual(Position.objects.count(), 0)
+
+    def test_create_batch_run_stopped_after_validation(self):
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_1.id,
+            'positions': [{'latitude': 10, 'longitude': 10, 'date_time': '2025-01-01T10:00:00.000000'}]
+        }
+        real_locked = Run.locked
+
+        def locked(run_id):
+            # Забег завершили между проверкой сериализатора и блокировкой.
+            Run.objects.filter(id=run_id).update(status='finished')
+            return real_locked(run_id)
+
+        with patch.object(Run, 'locked', side_effect=locked):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('run', response.data)
+        self.assertEqual(Position.objects.count(), 0)
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 0)
+
+    def test_create_batch_queries(self):
+        url = reverse('api-positions-batch')
+        data = {
+            'run': self.run_1.id,
+            'positions': [{'latitude': 10, 'longitude': 10 + i / 10000, 'date_time': '2025-01-01T10:00:00.000000'}
+                          for i in range(100)]
+        }
+        with self.assertNumQueries(7):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(Position.objects.count(), 100)
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 100)
+
+
+class RunTrackTotalsTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.athlete_info_1 = AthleteInfo.objects.create(user=self.athlete_1)
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+
+        self.position_1 = Position.objects.create(run=self.run_1, latitude=0.001, longitude=0.001,
+                                                  date_time=datetime(2025, 1, 1, 10, 0, 30, tzinfo=timezone.utc))
+        self.position_2 = Position.objects.create(run=self.run_1, latitude=0.010, longitude=0.011,
+                                                  date_time=datetime(2025, 1, 1, 10, 0, 0, tzinfo=timezone.utc))
+        self.position_3 = Position.objects.create(run=self.run_1, latitude=0.010, longitude=0.021,
+                                                  date_time=datetime(2025, 1, 1, 10, 5, 0, tzinfo=timezone.utc))
+
+    def expected_distance(self, *positions):
+        return sum(geodesic((a.latitude, a.longitude), (b.latitude, b.longitude)).kilometers
+                   for a, b in zip(positions, positions[1:]))
+
+    def test_totals_on_create(self):
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 3)
+        self.assertAlmostEqual(self.run_1.track_distance,
+                               self.expected_distance(self.position_1, self.position_2, self.position_3), places=5)
+        self.assertEqual(self.run_1.min_date_time, self.position_2.date_time)
+        self.assertEqual(self.run_1.max_date_time, self.position_3.date_time)
+        self.assertEqual((self.run_1.last_latitude, self.run_1.last_longitude), (0.010, 0.021))
+
+    def test_totals_on_delete(self):
+        self.position_3.delete()
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 2)
+        self.assertAlmostEqual(self.run_1.track_distance, self.expected_distance(self.position_1, self.position_2),
+                               places=5)
+        self.assertEqual(self.run_1.max_date_time, self.position_1.date_time)
+
+    def test_totals_on_move_to_other_run(self):
+        run_2 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        response = self.client.patch(reverse('api-positions-detail', args=[self.position_3.id]), {'run': run_2.id},
+                                     format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+        self.run_1.refresh_from_db()
+        run_2.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 2)
+        self.assertAlmostEqual(self.run_1.track_distance, self.expected_distance(self.position_1, self.position_2),
+                               places=5)
+        self.assertEqual(self.run_1.max_date_time, self.position_1.date_time)
+        self.assertEqual(run_2.positions_count, 1)
+        self.assertEqual((run_2.last_latitude, run_2.last_longitude), (0.010, 0.021))
+
+    def test_stop_uses_totals(self):
+        Run.objects.create(athlete=self.athlete_1, status='finished', distance=1)
+        url = reverse('api-runs-stop', args=[self.run_1.id])
+        with self.assertNumQueries(10):
+            response = self.client.post(url, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.run_time_seconds, 300)
+        self.assertAlmostEqual(self.run_1.distance, round(self.run_1.track_distance, 3))
+        stats = AthleteStats.objects.get(user=self.athlete_1)
+        self.assertEqual(stats.finished_runs, 2)
+        self.assertAlmostEqual(stats.total_distance, 1 + self.run_1.distance)
+
+    def test_rebuild_command(self):
+        Run.objects.filter(id=self.run_1.id).update(track_distance=0, positions_count=0, min_date_time=None)
+        call_command('rebuild_run_totals', stdout=StringIO())
+        self.run_1.refresh_from_db()
+        self.assertEqual(self.run_1.positions_count, 3)
+        self.assertAlmostEqual(self.run_1.track_distance,
+                               self.expected_distance(self.position_1, self.position_2, self.position_3), places=5)
+        self.assertEqual(self.run_1.min_date_time, self.position_2.date_time)
+
+
+class RunTransitionTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.athlete_info_1 = AthleteInfo.objects.create(user=self.athlete_1)
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='init')
+
+    def test_transition(self):
+        run = Run.objects.transition(self.run_1.id, 'init', 'in_progress')
+        self.assertEqual(run.id, self.run_1.id)
+        self.assertEqual(run.status, 'in_progress')
+        self.assertEqual(run.athlete_id, self.athlete_1.id)
+        self.assertIsNone(Run.objects.transition(self.run_1.id, 'init', 'in_progress'))
+
+    def test_start_twice(self):
+        url = reverse('api-runs-start', args=[self.run_1.id])
+        self.assertEqual(status.HTTP_201_CREATED, self.client.post(url).status_code)
+        response = self.client.post(url)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(response.data, {'detail': 'Invalid run status for starting.'})
+
+    def test_start_not_found(self):
+        response = self.client.post(reverse('api-runs-start', args=[self.run_1.id + 100]))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_stop_twice(self):
+        Run.objects.filter(id=self.run_1.id).update(status='in_progress')
+        url = reverse('api-runs-stop', args=[self.run_1.id])
+        self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, self.client.post(url).status_code)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, self.client.post(url).status_code)
+        self.assertEqual(Run.objects.get(id=self.run_1.id).status, 'finished')
+
+
+# На SQLite нужна файловая тестовая база с timeout (project_run.settings.local): общая in-memory база
+# отвечает на конкурентную запись ошибкой 'table is locked', а не ожиданием.
+class RunParallelStopTestCase(TransactionTestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        AthleteInfo.objects.create(user=self.athlete_1)
+        for i in range(9):
+            Run.objects.create(athlete=self.athlete_1, status='finished', distance=1)
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        for i in range(3):
+            Position.objects.create(run=self.run_1, latitude=0.01 * i, longitude=0.01,
+                                    date_time=datetime(2025, 1, 1, 10, i, tzinfo=timezone.utc))
+
+    def test_parallel_stop(self):
+        url = reverse('api-runs-stop', args=[self.run_1.id])
+        threads_count = 4
+        barrier = Barrier(threads_count)
+        codes = []
+
+        def stop():
+            try:
+                barrier.wait()
+                codes.append(APIClient().post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=stop) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(codes), [status.HTTP_200_OK] + [status.HTTP_400_BAD_REQUEST] * (threads_count - 1))
+        self.assertEqual(Challenge.objects.filter(full_name='Сделай 10 Забегов!').count(), 1)
+        self.assertEqual(RunTrack.objects.filter(run=self.run_1, tolerance=0).count(), 1)
+
+
+class AthleteStatsTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.athlete_2 = User.objects.create(username='Pavel')
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='finished', distance=5, run_time_seconds=600)
+        self.run_2 = Run.objects.create(athlete=self.athlete_1, status='finished', distance=12.5, run_time_seconds=1800)
+        self.run_3 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+
+    def test_finish(self):
+        stats = AthleteStats.objects.get(user=self.athlete_1)
+        self.assertEqual(stats.finished_runs, 2)
+        self.assertEqual(stats.total_distance, 17.5)
+        self.assertEqual(stats.total_time_seconds, 2400)
+        self.assertEqual(stats.longest_run_distance, 12.5)
+        self.assertEqual(stats.last_run_at, self.run_2.created_at)
+        self.assertFalse(AthleteStats.objects.filter(user=self.athlete_2).exists())
+
+    def test_edit_and_delete(self):
+        self.run_2.distance = 3
+        self.run_2.save()
+        stats = AthleteStats.objects.get(user=self.athlete_1)
+        self.assertEqual((stats.total_distance, stats.longest_run_distance), (8, 5))
+
+        self.run_1.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.finished_runs, stats.total_distance, stats.total_time_seconds), (1, 3, 1800))
+
+        self.run_3.status = 'finished'
+        self.run_3.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.finished_runs, 2)
+
+    def test_delete_user(self):
+        self.athlete_1.delete()
+        self.assertFalse(AthleteStats.objects.exists())
+
+    def test_user_runs_finished(self):
+        response = self.client.get(reverse('api-users-detail', args=(self.athlete_1.id,)))
+        self.assertEqual(response.data['runs_finished'], 2)
+
+    def test_check_and_rebuild_commands(self):
+        out = StringIO()
+        call_command('check_athlete_stats', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+        AthleteStats.objects.filter(user=self.athlete_1).update(finished_runs=7, total_distance=0)
+        with self.assertRaises(CommandError):
+            call_command('check_athlete_stats', stdout=StringIO())
+        call_command('rebuild_athlete_stats', self.athlete_1.id, stdout=StringIO())
+        call_command('check_athlete_stats', stdout=StringIO())
+
+        AthleteStats.objects.all().delete()
+        call_command('check_athlete_stats', '--fix', stdout=StringIO())
+        self.assertEqual(AthleteStats.objects.get(user=self.athlete_1).finished_runs, 2)
+
+
+class SyntheticDataTestCase(APITestCase):
+    def test_generate(self):
+        call_command('generate_synthetic_data', users=3, runs_per_user=2, positions_per_run=5, items=10,
+                     in_progress=0, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='synthetic_').count(), 3)
+        self.assertEqual(Position.objects.count(), 30)
+        self.assertEqual(CollectibleItem.objects.count(), 10)
+        run = Run.objects.first()
+        self.assertEqual((run.status, run.positions_count), ('finished', 5))
+        self.assertAlmostEqual(run.distance, run.track_distance, places=3)
+        self.assertEqual(AthleteStats.objects.get(user=run.athlete).finished_runs, 2)
+        call_command('check_athlete_stats', stdout=StringIO())
+
+        call_command('generate_synthetic_data', users=1, runs_per_user=1, positions_per_run=5, items=1, clear=True,
+                     stdout=StringIO())
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(CollectibleItem.objects.count(), 1)
+
+
+def make_xlsx(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Name', 'UID', 'Value', 'Latitude', 'Longitude', 'URL'])
+    for row in rows:
+        ws.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return SimpleUploadedFile('items.xlsx', buffer.getvalue())
+
+
+class UploadFileTestCase(APITestCase):
+    def setUp(self):
+        self.collectible_item_1 = CollectibleItem.objects.create(name='chocolate', uid='123', latitude=76.21,
+                                                                 longitude=32.21, value=1, picture='www.google.com')
+
+    def test_upload(self):
+        rows = [
+            ['apple', 'a1', 10, 55.75, 37.61, 'https://example.com/apple.png'],
+            ['chocolate', '123', 1, 76.21, 32.21, 'https://example.com/chocolate.png'],
+            ['pear', 'p1', 'ten', 55.75, 37.61, 'https://example.com/pear.png'],
+            ['pear', 'p2', 5, 55.75, 37.61, 'not a url'],
+            ['apple copy', 'a1', 10, 55.75, 37.61, 'https://example.com/apple.png'],
+            ['plum', 456, 3, 10, 20, 'https://example.com/plum.png'],
+        ]
+        url = reverse('api-upload-file')
+        response = self.client.post(url, {'file': make_xlsx(rows)}, format='multipart')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual([rows[2], rows[3]], response.data)
+        self.assertEqual(['123', '456', 'a1'], list(CollectibleItem.objects.order_by('uid').values_list('uid', flat=True)))
+        apple = CollectibleItem.objects.get(uid='a1')
+        self.assertEqual((apple.name, apple.cell_lat, apple.cell_lon), ('apple', 5575, 3761))
+
+    def test_upload_chunked(self):
+        rows = [[f'item {i}', f'uid{i}', 1, 10, 20, 'https://example.com/item.png'] for i in range(12)]
+        rows.append(['duplicate', 'uid3', 1, 10, 20, 'https://example.com/item.png'])
+        with patch('app_run.imports.IMPORT_CHUNK_SIZE', 5):
+            with self.assertNumQueries(6):
+                response = self.client.post(reverse('api-upload-file'), {'file': make_xlsx(rows)},
+                                            format='multipart')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual([], response.data)
+        self.assertEqual(CollectibleItem.objects.count(), 13)
+        self.assertFalse(CollectibleItem.objects.filter(name='duplicate').exists())
+
+    def test_upload_not_xlsx(self):
+        url = reverse('api-upload-file')
+        response = self.client.post(url, {'file': SimpleUploadedFile('items.csv', b'a,b')}, format='multipart')
+        self.assertEqual(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, response.status_code)
+
+
+@override_settings(IMPORT_JOB_WORKERS=0)
+class ImportJobTestCase(APITestCase):
+    def setUp(self):
+        self.collectible_item_1 = CollectibleItem.objects.create(name='chocolate', uid='123', latitude=76.21,
+                                                                 longitude=32.21, value=1, picture='www.google.com')
+
+    def test_upload_background(self):
+        rows = [
+            ['apple', 'a1', 10, 55.75, 37.61, 'https://example.com/apple.png'],
+            ['chocolate', '123', 1, 76.21, 32.21, 'https://example.com/chocolate.png'],
+            ['pear', 'p1', 'ten', 55.75, 37.61, 'https://example.com/pear.png'],
+        ]
+        url = reverse('api-upload-file') + '?background=1'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'file': make_xlsx(rows)}, format='multipart')
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+
+        response = self.client.get(reverse('api-upload-file-job', args=[response.data['job_id']]))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('finished', response.data['status'])
+        self.assertEqual((3, 1, 1, 1), (response.data['rows_processed'], response.data['inserted'],
+                                        response.data['skipped'], response.data['invalid']))
+        self.assertEqual([rows[2]], response.data['invalid_rows'])
+        self.assertTrue(CollectibleItem.objects.filter(uid='a1').exists())
+
+    def test_run_import_jobs_command(self):
+        rows = [['apple', 'a1', 10, 55.75, 37.61, 'https://example.com/apple.png']]
+        job = ImportJob.objects.create(file_name='items.xlsx', file=make_xlsx(rows).read())
+        call_command('run_import_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(('finished', 1, b''), (job.status, job.inserted, bytes(job.file)))
+
+    def test_stale_running_job_reclaimed(self):
+        rows = [['apple', 'a1', 10, 55.75, 37.61, 'https://example.com/apple.png']]
+        started_at = datetime.now(timezone.utc) - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS + 60)
+        stale = ImportJob.objects.create(file_name='items.xlsx', file=make_xlsx(rows).read(), status='running',
+                                         started_at=started_at, rows_processed=1)
+        # Процесс этой задачи ещё работает: её не трогают.
+        running = ImportJob.objects.create(file_name='items.xlsx', file=make_xlsx(rows).read(), status='running',
+                                           started_at=datetime.now(timezone.utc))
+        call_command('run_import_jobs', stdout=StringIO())
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(('finished', 1, 1), (stale.status, stale.rows_processed, stale.inserted))
+        self.assertGreater(stale.started_at, started_at)
+        self.assertEqual('running', running.status)
+
+    def test_failed_job(self):
+        job = ImportJob.objects.create(file_name='items.xlsx', file=b'not a workbook')
+        with self.assertLogs('app_run.jobs', 'ERROR'):
+            call_command('run_import_jobs', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual('failed', job.status)
+        self.assertTrue(job.error)
+
+    def test_job_not_found(self):
+        response = self.client.get(reverse('api-upload-file-job', args=[100]))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
+class CursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.athlete_2 = User.objects.create(username='Pavel')
+        self.runs = [Run.objects.create(athlete=self.athlete_1, status='in_progress') for _ in range(7)]
+        self.positions = [Position.objects.create(run=self.runs[0], latitude=0.0001 * i, longitude=0.0001)
+                          for i in range(5)]
+
+    def collect_pages(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_runs_cursor(self):
+        url = reverse('api-runs-list')
+        ids = self.collect_pages(url, {'pagination': 'cursor', 'size': 3})
+        self.assertEqual([run.id for run in self.runs], ids)
+
+    def test_runs_cursor_ordering(self):
+        url = reverse('api-runs-list')
+        ids = self.collect_pages(url, {'pagination': 'cursor', 'size': 3, 'ordering': '-created_at'})
+        self.assertEqual([run.id for run in reversed(self.runs)], ids)
+
+    def test_runs_cursor_queries(self):
+        url = reverse('api-runs-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'pagination': 'cursor', 'size': 3})
+        with self.assertNumQueries(1):
+            self.client.get(response.data['next'])
+
+    def test_users_cursor(self):
+        url = reverse('api-users-list')
+        ids = self.collect_pages(url, {'pagination': 'cursor', 'size': 1})
+        self.assertEqual([self.athlete_1.id, self.athlete_2.id], ids)
+
+    def test_positions_cursor(self):
+        url = reverse('api-positions-list')
+        ids = self.collect_pages(url, {'pagination': 'cursor', 'size': 2, 'run': self.runs[0].id})
+        self.assertEqual([position.id for position in self.positions], ids)
+
+    def test_positions_page_number(self):
+        url = reverse('api-positions-list')
+        response = self.client.get(url, {'size': 2, 'page': 2})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(5, response.data['count'])
+        self.assertEqual([self.positions[2].id, self.positions[3].id], [item['id'] for item in response.data['results']])
+
+
+class PositionStreamTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        self.run_2 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        self.positions = [
+            Position.objects.create(run=self.run_1, latitude=0.0001 * i, longitude=0.0002,
+                                    date_time=datetime(2025, 1, 1, 10, 0, i, 123456, tzinfo=timezone.utc))
+            for i in range(5)
+        ]
+        self.positions.append(Position.objects.create(run=self.run_1, latitude=1, longitude=1))
+        Position.objects.create(run=self.run_2, latitude=1, longitude=1)
+
+    def test_stream_json(self):
+        url = reverse('api-positions-list')
+        response = self.client.get(url, {'run': self.run_1.id, 'stream': 'json'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertEqual('application/json', response['Content-Type'])
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(PositionSerializer(self.positions, many=True).data, data)
+
+    def test_stream_ndjson(self):
+        url = reverse('api-positions-list')
+        with patch('app_run.views.STREAM_CHUNK_SIZE', 2):
+            response = self.client.get(url, {'run': self.run_1.id, 'stream': 'ndjson'})
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        data = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(PositionSerializer(self.positions, many=True).data, data)
+
+    def test_stream_empty(self):
+        url = reverse('api-positions-list')
+        response = self.client.get(url, {'run': 1000, 'stream': 'json'})
+        self.assertEqual([], json.loads(b''.join(response.streaming_content)))
+
+
+class RunTrackTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        self.points = [(55.7558, 37.6173), (55.7559, 37.6175), (55.7561, 37.6178)]
+        times = [datetime(2025, 1, 1, 10, 0, 0, tzinfo=timezone.utc), None,
+                 datetime(2025, 1, 1, 10, 0, 2, 500000, tzinfo=timezone.utc)]
+        for (latitude, longitude), date_time in zip(self.points, times):
+            Position.objects.create(run=self.run_1, latitude=latitude, longitude=longitude, date_time=date_time)
+
+    def test_track(self):
+        url = reverse('api-runs-track', args=[self.run_1.id])
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(3, response.data['points_count'])
+        self.assertEqual(self.points, decode(response.data['polyline']))
+        self.assertNotIn('time_deltas', response.data)
+        self.assertFalse(RunTrack.objects.exists())
+
+    def test_track_timestamps(self):
+        url = reverse('api-runs-track', args=[self.run_1.id])
+        response = self.client.get(url, {'timestamps': 1})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('2025-01-01T10:00:00Z', response.data['start_time'])
+        self.assertEqual([0, None, 2500], response.data['time_deltas'])
+
+    def test_finished_track_cached(self):
+        Run.objects.filter(id=self.run_1.id).update(status='finished')
+        url = reverse('api-runs-track', args=[self.run_1.id])
+        self.client.get(url)
+        self.assertEqual(1, RunTrack.objects.filter(run=self.run_1).count())
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(self.points, decode(response.data['polyline']))
+
+
+class RunTrackSimplifyTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        AthleteInfo.objects.create(user=self.athlete_1)
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        # Прямая с одним поворотом: 50 точек на север, затем 50 на восток.
+        points = [(55.75 + i * 0.0001, 37.61) for i in range(50)]
+        points += [(55.75 + 49 * 0.0001, 37.61 + i * 0.0002) for i in range(1, 51)]
+        Position.objects.bulk_create([Position(run=self.run_1, latitude=latitude, longitude=longitude)
+                                      for latitude, longitude in points])
+        self.run_1.rebuild_track()
+        self.points = points
+
+    def test_tolerance_for_zoom(self):
+        self.assertEqual(100, RunTrack.tolerance_for_zoom(5))
+        self.assertEqual(25, RunTrack.tolerance_for_zoom(13))
+        self.assertEqual(1.5, RunTrack.tolerance_for_zoom(16))
+        self.assertEqual(0, RunTrack.tolerance_for_zoom(18))
+
+    def test_stop_stores_tracks(self):
+        response = self.client.post(reverse('api-runs-stop', args=[self.run_1.id]), format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        tracks = {track.tolerance: track for track in RunTrack.objects.filter(run=self.run_1)}
+        self.assertEqual({0, 1.5, 6, 25, 100}, set(tracks))
+        self.assertEqual(100, tracks[0].points_count)
+        self.assertEqual([self.points[0], self.points[49], self.points[-1]], decode(tracks[100].polyline))
+
+    def test_track_zoom(self):
+        self.client.post(reverse('api-runs-stop', args=[self.run_1.id]), format='json')
+        url = reverse('api-runs-track', args=[self.run_1.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'zoom': 11})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((100, 3), (response.data['tolerance'], response.data['points_count']))
+
+    def test_track_invalid_zoom(self):
+        url = reverse('api-runs-track', args=[self.run_1.id])
+        response = self.client.get(url, {'zoom': 'far'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app_run import challenges
+from app_run.challenges import Rule, FINISHED_RUNS, TOTAL_DISTANCE, RUN_DISTANCE, RUN_PACE, ITEMS_COLLECTED
+from app_run.models import Run, AthleteInfo, AthleteStats, Challenge, Position, CollectibleItem
+
+
+class RuleTestCase(TestCase):
+    def test_is_met(self):
+        self.assertTrue(Rule('a', 'A', FINISHED_RUNS, 10).is_met({FINISHED_RUNS: 10}))
+        self.assertFalse(Rule('a', 'A', FINISHED_RUNS, 10).is_met({FINISHED_RUNS: 9}))
+        self.assertTrue(Rule('p', 'P', RUN_PACE, 300, lower_is_better=True).is_met({RUN_PACE: 290}))
+        self.assertFalse(Rule('p', 'P', RUN_PACE, 300, lower_is_better=True).is_met({}))
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            Rule('a', 'A', 'calories', 10)
+
+    def test_metrics(self):
+        stats = AthleteStats(finished_runs=3, total_distance=12.5, items_collected=2)
+        run = Run(distance=5, run_time_seconds=1500)
+        self.assertEqual(challenges.metrics(stats, run), {
+            FINISHED_RUNS: 3, TOTAL_DISTANCE: 12.5, ITEMS_COLLECTED: 2, RUN_DISTANCE: 5, RUN_PACE: 300})
+        self.assertNotIn(RUN_PACE, challenges.metrics(stats, Run(distance=0, run_time_seconds=10)))
+
+
+class AwardTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        self.athlete_info_1 = AthleteInfo.objects.create(user=self.athlete_1)
+        self.run_1 = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        for i, (latitude, minute) in enumerate([(0.0, 0), (0.05, 25)]):
+            Position.objects.create(run=self.run_1, latitude=latitude, longitude=0.0,
+                                    date_time=datetime(2025, 1, 1, 10, minute, tzinfo=timezone.utc))
+
+    def stop(self, run):
+        response = self.client.post(reverse('api-runs-stop', args=[run.id]))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_award_idempotent(self):
+        stats = AthleteStats(user=self.athlete_1, finished_runs=10, total_distance=60)
+        self.assertEqual(len(challenges.award(self.athlete_info_1, stats)), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(challenges.award(self.athlete_info_1, stats), [])
+        self.assertEqual(sorted(Challenge.objects.values_list('rule', flat=True)), ['distance_50', 'runs_10'])
+
+    def test_run_rules(self):
+        rules = {
+            'run_5km': Rule('run_5km', 'Пробеги 5 километров за раз!', RUN_DISTANCE, 5),
+            'pace_5': Rule('pace_5', 'Темп быстрее 5:00!', RUN_PACE, 300, lower_is_better=True),
+            'items_1': Rule('items_1', 'Собери предмет!', ITEMS_COLLECTED, 1),
+        }
+        with patch.dict(challenges.RULES, rules, clear=True):
+            self.stop(self.run_1)
+        # 5.5 км за 25 минут: темп ~4:32 на километр, предметов нет.
+        self.assertEqual(sorted(Challenge.objects.values_list('rule', flat=True)), ['pace_5', 'run_5km'])
+
+    def test_items_collected(self):
+        item = CollectibleItem.objects.create(name='apple', uid='1', latitude=1, longitude=1, value=1,
+                                              picture='http://example.com/1.png')
+        self.athlete_1.collectible_items.add(item)
+        Run.objects.create(athlete=self.athlete_1, status='finished')
+        self.assertEqual(AthleteStats.objects.get(user=self.athlete_1).items_collected, 1)
+
+        item.collected_by.clear()
+        self.assertEqual(AthleteStats.objects.get(user=self.athlete_1).items_collected, 0)
+
+    def test_queries_do_not_depend_on_rules(self):
+        other = Run.objects.create(athlete=self.athlete_1, status='in_progress')
+        for latitude in (0.0, 0.01):
+            Position.objects.create(run=other, latitude=latitude, longitude=0.0)
+        Run.objects.create(athlete=self.athlete_1, status='finished', distance=1)
+
+        with patch.dict(challenges.RULES, {'runs_1': Rule('runs_1', 'Один забег', FINISHED_RUNS, 1)}, clear=True):
+            with CaptureQueriesContext(connection) as few:
+                self.stop(self.run_1)
+
+        rules = {f'runs_{i}': Rule(f'runs_{i}', f'{i} забегов', FINISHED_RUNS, i) for i in range(1, 31)}
+        with patch.dict(challenges.RULES, rules, clear=True):
+            with CaptureQueriesContext(connection) as many:
+                self.stop(other)
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(Challenge.objects.filter(athlete=self.athlete_info_1).count(), 3)
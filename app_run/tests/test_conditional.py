@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app_run.models import Run, AthleteInfo, AthleteStats, Position, CollectibleItem
+
+START = datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username='Kristina')
+        AthleteInfo.objects.create(user=self.user)
+        self.run = Run.objects.create(athlete=self.user, status='in_progress')
+        self.add_positions(self.run, 3)
+        self.item = CollectibleItem.objects.create(name='apple', uid='uid_1', latitude=50, longitude=50, value=1,
+                                                   picture='https://example.com/apple.png')
+
+    def add_positions(self, run, count):
+        start = run.positions_count
+        points = [(10 + j / 1000, 10, START + timedelta(seconds=j)) for j in range(start, start + count)]
+        Position.objects.bulk_create([Position(run=run, latitude=lat, longitude=lon, date_time=date_time)
+                                      for lat, lon, date_time in points])
+        run.extend_track(points)
+
+    def get(self, url, params=None, **headers):
+        return self.client.get(url, params, headers=headers)
+
+    def assertNotModified(self, url, params=None):
+        response = self.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            not_modified = self.get(url, params, if_none_match=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        return response
+
+    def assertModified(self, url, response, params=None):
+        changed = self.get(url, params, if_none_match=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        return changed
+
+    def stop_run(self):
+        response = self.client.post(reverse('api-runs-stop', args=[self.run.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_run_in_progress(self):
+        url = reverse('api-runs-detail', args=[self.run.id])
+        response = self.assertNotModified(url)
+        self.assertNotIn('Last-Modified', response)
+
+        self.add_positions(Run.objects.get(id=self.run.id), 1)
+        response = self.assertModified(url, response)
+        self.stop_run()
+        self.assertEqual(self.assertModified(url, response).json()['status'], 'finished')
+
+    def test_finished_run(self):
+        self.stop_run()
+        url = reverse('api-runs-detail', args=[self.run.id])
+        response = self.assertNotModified(url)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_run_athlete_renamed(self):
+        url = reverse('api-runs-detail', args=[self.run.id])
+        response = self.assertNotModified(url)
+        self.user.first_name = 'Kris'
+        self.user.save()
+        self.assertEqual(self.assertModified(url, response).json()['athlete_data']['first_name'], 'Kris')
+        self.user.username = 'kris'
+        self.user.save()
+        self.assertModified(url, response)
+
+    def test_run_not_found(self):
+        self.assertEqual(self.get(reverse('api-runs-detail', args=[0])).status_code, 404)
+
+    def test_positions(self):
+        url = reverse('api-positions-list')
+        response = self.assertNotModified(url, {'run': self.run.id})
+        other_page = self.get(url, {'run': self.run.id, 'size': 1}, if_none_match=response['ETag'])
+        self.assertEqual(other_page.status_code, 200)
+
+        self.add_positions(Run.objects.get(id=self.run.id), 1)
+        self.assertEqual(len(self.assertModified(url, response, {'run': self.run.id}).json()), 4)
+        self.assertNotIn('ETag', self.get(url))
+
+    def test_positions_finished_run(self):
+        self.stop_run()
+        response = self.assertNotModified(reverse('api-positions-list'), {'run': self.run.id, 'stream': 'ndjson'})
+        self.assertIn('Last-Modified', response)
+
+    def test_user(self):
+        url = reverse('api-users-detail', args=[self.user.id])
+        response = self.assertNotModified(url)
+        self.assertNotIn('Last-Modified', response)
+
+        self.user.collectible_items.add(self.item)
+        response = self.assertModified(url, response)
+        self.item.name = 'pear'
+        self.item.save(update_fields=['name'])
+        response = self.assertModified(url, response)
+        self.user.first_name = 'Kris'
+        self.user.save()
+        response = self.assertModified(url, response)
+        self.stop_run()
+        self.assertEqual(self.assertModified(url, response).json()['runs_finished'], 1)
+
+    def test_user_items_swapped(self):
+        older = CollectibleItem.objects.create(name='pear', uid='uid_2', latitude=50, longitude=50, value=1,
+                                               picture='https://example.com/pear.png')
+        newest = CollectibleItem.objects.create(name='plum', uid='uid_3', latitude=50, longitude=50, value=1,
+                                                picture='https://example.com/plum.png')
+        CollectibleItem.objects.filter(id=older.id).update(updated_at=START)
+        self.user.collectible_items.add(self.item, newest)
+        self.assertFalse(AthleteStats.objects.filter(user=self.user).exists())
+        url = reverse('api-users-detail', args=[self.user.id])
+        response = self.assertNotModified(url)
+
+        # Количество и последний updated_at прежние.
+        self.user.collectible_items.remove(self.item)
+        self.user.collectible_items.add(older)
+        names = [item['name'] for item in self.assertModified(url, response).json()['items']]
+        self.assertEqual(sorted(names), ['pear', 'plum'])
+
+    def test_stats_updated_at(self):
+        stats = AthleteStats.rebuild(self.user.id)
+        AthleteStats.refresh_items([self.user.id])
+        refreshed = AthleteStats.objects.get(id=stats.id).updated_at
+        self.assertGreater(refreshed, stats.updated_at)
+        AthleteStats.refresh(self.user.id)
+        self.assertGreater(AthleteStats.objects.get(id=stats.id).updated_at, refreshed)
+
+    def test_run_transition_updated_at(self):
+        updated_at = Run.objects.get(id=self.run.id).updated_at
+        run = Run.objects.transition(self.run.id, 'in_progress', 'finished')
+        self.assertGreater(run.updated_at, updated_at)
+        self.assertEqual(Run.objects.get(id=self.run.id).updated_at, run.updated_at)
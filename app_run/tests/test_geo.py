@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from app_run.geo import grid_cell, nearby_cells_q
+from app_run.models import CollectibleItem
+
+
+class GridCellTestCase(TestCase):
+    def test_grid_cell(self):
+        self.assertEqual(grid_cell(55.7558, 37.6173), (5575, 3761))
+        self.assertEqual(grid_cell(-0.001, -0.001), (-1, -1))
+        self.assertEqual(grid_cell(0, 180), grid_cell(0, -180))
+
+    def test_item_cell_updated_on_save(self):
+        item = CollectibleItem.objects.create(name='Item', uid='1', latitude=55.7558, longitude=37.6173,
+                                              picture='http://example.com/pic.jpg', value=1)
+        self.assertEqual((item.cell_lat, item.cell_lon), (5575, 3761))
+
+        item.latitude = 10.0
+        item.save(update_fields=['latitude'])
+        item.refresh_from_db()
+        self.assertEqual((item.cell_lat, item.cell_lon), (1000, 3761))
+
+
+class NearbyCellsTestCase(TestCase):
+    def create_item(self, uid, latitude, longitude):
+        return CollectibleItem.objects.create(name='Item', uid=uid, latitude=latitude, longitude=longitude,
+                                              picture='http://example.com/pic.jpg', value=1)
+
+    def test_neighbour_cell(self):
+        item = self.create_item('1', 55.75001, 37.60001)
+        self.create_item('2', 55.76, 37.61)
+        items = CollectibleItem.objects.filter(nearby_cells_q(55.7499, 37.5999))
+        self.assertEqual(list(items), [item])
+
+    def test_antimeridian(self):
+        item = self.create_item('1', 10.0, 179.9995)
+        self.create_item('2', 10.0, 179.9)
+        items = CollectibleItem.objects.filter(nearby_cells_q(10.0, -179.9995))
+        self.assertEqual(list(items), [item])
+
+    def test_pole(self):
+        item = self.create_item('1', 89.9995, 0)
+        self.create_item('2', 89.9, 0)
+        items = CollectibleItem.objects.filter(nearby_cells_q(89.9995, 120))
+        self.assertEqual(list(items), [item])
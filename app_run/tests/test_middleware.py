@@ -0,0 +1,95 @@
+import pstats
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app_run.models import Run
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=1.0, REQUEST_METRICS_SLOW_MS=10_000,
+                   REQUEST_METRICS_SLOW_QUERIES=100)
+class RequestMetricsMiddlewareTestCase(APITestCase):
+    def setUp(self):
+        self.athlete_1 = User.objects.create(username='Kristina')
+        Run.objects.create(athlete=self.athlete_1, status='init')
+
+    def test_server_timing(self):
+        with self.assertLogs('app_run.metrics', 'INFO') as logs:
+            response = self.client.get(reverse('api-runs-list'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="1 queries", serializer;dur=[\d.]+, total;dur=[\d.]+$')
+
+        metrics = logs.records[0].metrics
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(metrics['route'], 'api-runs-list')
+        self.assertEqual((metrics['queries'], metrics['status'], metrics['slow']), (1, 200, False))
+        self.assertGreater(metrics['serializer_ms'], 0)
+        self.assertGreaterEqual(metrics['total_ms'], metrics['db_ms'])
+
+    @override_settings(REQUEST_METRICS_SLOW_QUERIES=1)
+    def test_slow(self):
+        with self.assertLogs('app_run.metrics', 'WARNING') as logs:
+            self.client.get(reverse('api-runs-list'))
+        self.assertTrue(logs.records[0].metrics['slow'])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse('api-runs-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('api-runs-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_queries_counted(self):
+        response = self.client.get(reverse('api-users-detail', args=[self.athlete_1.id]))
+        self.assertEqual(int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1)), 3)
+
+
+class ProfilingMiddlewareTestCase(APITestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.athlete_1 = User.objects.create(username='Kristina')
+
+    def profile_settings(self, **kwargs):
+        values = {'PROFILE_ROUTES': ['api-runs-list:GET', 'api-users-list'], 'PROFILE_SAMPLE_RATE': 1,
+                  'PROFILE_DIR': self.directory, 'PROFILE_MAX_BYTES': 10 * 1024 * 1024, 'PROFILE_BACKUP_COUNT': 2}
+        values.update(kwargs)
+        return override_settings(**values)
+
+    def test_aggregated(self):
+        with self.profile_settings():
+            self.client.get(reverse('api-runs-list'))
+            self.client.get(reverse('api-runs-list'))
+            self.client.post(reverse('api-runs-list'), {'athlete': self.athlete_1.id}, format='json')
+            self.client.get(reverse('api-users-list'))
+
+        self.assertEqual({'api-runs-list.GET.pstats', 'api-users-list.GET.pstats'},
+                         {path.name for path in self.directory.iterdir()})
+        stats = pstats.Stats(str(self.directory / 'api-runs-list.GET.pstats'))
+        calls = [call_count for (_, _, name), (_, call_count, *_) in stats.stats.items() if name == 'list']
+        self.assertIn(2, calls)
+
+    def test_rotation(self):
+        with self.profile_settings(PROFILE_MAX_BYTES=1):
+            for _ in range(4):
+                self.client.get(reverse('api-users-list'))
+        self.assertEqual({'api-users-list.GET.pstats', 'api-users-list.GET.pstats.1', 'api-users-list.GET.pstats.2'},
+                         {path.name for path in self.directory.iterdir()})
+
+    def test_disabled(self):
+        with self.profile_settings(PROFILE_ROUTES=[]):
+            self.client.get(reverse('api-users-list'))
+        with self.profile_settings(PROFILE_SAMPLE_RATE=0):
+            self.client.get(reverse('api-users-list'))
+        self.assertEqual([], list(self.directory.iterdir()))
@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase
+
+from app_run.polyline import encode, decode
+
+
+class PolylineTestCase(SimpleTestCase):
+    def test_encode_reference(self):
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual('_p~iF~ps|U_ulLnnqC_mqNvxq`@', encode(points))
+
+    def test_round_trip(self):
+        points = [(55.7558, 37.6173), (-33.8688, 151.2093), (0.0, -0.00001), (89.99999, -179.99999)]
+        self.assertEqual(points, decode(encode(points)))
+
+    def test_empty(self):
+        self.assertEqual('', encode([]))
+        self.assertEqual([], decode(''))
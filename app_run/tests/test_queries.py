@@ -0,0 +1,193 @@
+"""Число SQL-запросов на эндпоинт при разном объёме данных и планы горячих запросов.
+
+По умолчанию на SQLite; на PostgreSQL:
+    DJANGO_SETTINGS_MODULE=project_run.settings.local_postgres python manage.py test app_run.tests.test_queries
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem
+from app_run.tests.test_api import make_xlsx
+
+START = datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+
+
+# Считаются запросы при построении ответа, поэтому кэш ответов выключен (его проверяет test_response_cache).
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryCountTestCase(TestCase):
+    """Число запросов не должно зависеть от объёма данных: рост между размерами — это N+1."""
+    sizes = (1, 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.users = []
+
+    def seed(self, count):
+        while len(self.users) < count:
+            i = len(self.users)
+            user = User.objects.create(username=f'user_{i}', first_name=f'Name{i}')
+            athlete_info = AthleteInfo.objects.create(user=user, goals='', weight=60)
+            Challenge.objects.create(athlete=athlete_info, full_name=f'Challenge {i}')
+            for status in ('finished', 'in_progress'):
+                run = Run.objects.create(athlete=user, status=status)
+                Position.objects.bulk_create([
+                    Position(run=run, latitude=10 + j / 1000, longitude=10, date_time=START + timedelta(seconds=j))
+                    for j in range(3)])
+                run.rebuild_track()
+            item = CollectibleItem.objects.create(name='apple', uid=f'uid_{i}', latitude=50, longitude=50, value=1,
+                                                  picture='https://example.com/apple.png')
+            user.collectible_items.add(item)
+            self.users.append(user)
+
+    def count_queries(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        return len(queries)
+
+    def assertQueries(self, expected, request):
+        counts = []
+        for size in self.sizes:
+            self.seed(size)
+            counts.append(self.count_queries(request))
+        self.assertEqual(counts, [expected] * len(self.sizes), f'queries for sizes {self.sizes}')
+
+    def get(self, name, *args, **params):
+        return lambda: self.client.get(reverse(name, args=args), params)
+
+    def test_company_details(self):
+        self.assertQueries(0, self.get('company_details'))
+
+    def test_runs(self):
+        self.assertQueries(1, self.get('api-runs-list'))
+        self.assertQueries(2, self.get('api-runs-list', size=5))
+        self.assertQueries(1, self.get('api-runs-list', pagination='cursor', size=5))
+        # Фильтр athlete проверяет существование пользователя отдельным запросом.
+        self.assertQueries(2, self.get('api-runs-list', status='finished', athlete=1))
+
+    def test_run_detail(self):
+        self.seed(1)
+        run = Run.objects.filter(status='finished').first()
+        # Плюс один запрос состояния для ETag/Last-Modified.
+        self.assertQueries(2, self.get('api-runs-detail', run.id))
+        self.client.get(reverse('api-runs-track', args=[run.id]))
+        self.assertQueries(2, self.get('api-runs-track', run.id))
+
+    def test_users(self):
+        self.assertQueries(1, self.get('api-users-list'))
+        self.assertQueries(2, self.get('api-users-list', size=5, search='Name'))
+        self.seed(1)
+        self.assertQueries(3, self.get('api-users-detail', self.users[0].id))
+
+    def test_challenges(self):
+        self.assertQueries(1, self.get('api-challenges-list'))
+        self.seed(1)
+        self.assertQueries(1, self.get('api-challenges-list', athlete=self.users[0].athleteinfo.id))
+
+    def test_positions(self):
+        self.assertQueries(1, self.get('api-positions-list'))
+        self.seed(1)
+        run_id = Run.objects.first().id
+        self.assertQueries(2, self.get('api-positions-list', run=run_id))
+        self.assertQueries(1, self.get('api-positions-list', stream='ndjson'))
+
+    def test_collectible_items(self):
+        self.assertQueries(1, self.get('api-collectible-item-list'))
+
+    def test_athlete_info(self):
+        self.seed(1)
+        self.assertQueries(2, self.get('api-athlete-info', self.users[0].id))
+
+    def test_run_start_stop(self):
+        self.seed(1)
+        user = self.users[0]
+        run = Run.objects.create(athlete=user, status='init')
+        self.assertEqual(self.count_queries(lambda: self.client.post(reverse('api-runs-start', args=[run.id]))), 2)
+        Position.objects.bulk_create([Position(run=run, latitude=10, longitude=10 + j / 1000) for j in range(3)])
+        run.rebuild_track()
+        self.assertEqual(self.count_queries(lambda: self.client.post(reverse('api-runs-stop', args=[run.id]))), 10)
+
+    def test_position_create(self):
+        self.seed(1)
+        run = Run.objects.filter(status='in_progress').first()
+        data = {'run': run.id, 'latitude': 50, 'longitude': 50, 'date_time': '2025-01-01T11:00:00.000000'}
+        self.assertEqual(self.count_queries(
+            lambda: self.client.post(reverse('api-positions-list'), data, format='json')), 8)
+
+    def test_position_batch(self):
+        self.seed(1)
+        run = Run.objects.filter(status='in_progress').first()
+        for count in (1, 50):
+            data = {'run': run.id, 'positions': [
+                {'latitude': 10, 'longitude': 10 + j / 10000, 'date_time': '2025-01-01T11:00:00.000000'}
+                for j in range(count)]}
+            self.assertEqual(self.count_queries(
+                lambda: self.client.post(reverse('api-positions-batch'), data, format='json')), 7)
+
+    def test_upload_file(self):
+        for count in (1, 50):
+            rows = [[f'Item {count}-{i}', f'file_uid_{count}_{i}', 1, 10, 10, 'https://example.com/1.png']
+                    for i in range(count)]
+            self.assertEqual(self.count_queries(
+                lambda: self.client.post(reverse('api-upload-file'), {'file': make_xlsx(rows)})), 2)
+
+
+class QueryPlanTestCase(TestCase):
+    """Горячие запросы должны идти по индексу, а не полным просмотром таблицы."""
+
+    def setUp(self):
+        user = User.objects.create(username='Kristina')
+        athlete_info = AthleteInfo.objects.create(user=user)
+        Challenge.objects.create(athlete=athlete_info, full_name='Сделай 10 Забегов!')
+        run = Run.objects.create(athlete=user, status='finished')
+        Position.objects.create(run=run, latitude=10, longitude=10, date_time=START)
+        CollectibleItem.objects.create(name='apple', uid='uid_1', latitude=50, longitude=50, value=1,
+                                       picture='https://example.com/apple.png')
+        self.user, self.athlete_info, self.run = user, athlete_info, run
+
+    def plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # На маленьких таблицах PostgreSQL и так выберет Seq Scan; проверяется, что индекс применим.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, table, index=None):
+        plan = self.plan(queryset)
+        if connection.vendor == 'sqlite':
+            self.assertIsNone(re.search(rf'SCAN {table}$', plan, re.MULTILINE), plan)
+            self.assertRegex(plan, rf'(SEARCH|SCAN) {table} USING (COVERING )?INDEX')
+        elif connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan)
+        if index:
+            self.assertIn(index, plan)
+
+    def test_positions_by_run(self):
+        self.assertUsesIndex(Position.objects.filter(run=self.run).order_by('id'), 'app_run_position',
+                             'position_run_id_idx')
+
+    def test_position_times_by_run(self):
+        self.assertUsesIndex(Position.objects.filter(run=self.run, date_time__isnull=False).order_by('date_time'),
+                             'app_run_position', 'position_run_date_time_idx')
+
+    def test_runs_by_athlete_status(self):
+        self.assertUsesIndex(Run.objects.filter(athlete=self.user, status='in_progress'), 'app_run_run',
+                             'run_athlete_status_idx')
+
+    def test_users_by_date_joined(self):
+        self.assertUsesIndex(User.objects.order_by('date_joined')[:50], 'auth_user', 'auth_user_date_joined_idx')
+
+    def test_challenges_by_athlete(self):
+        self.assertUsesIndex(Challenge.objects.filter(athlete=self.athlete_info), 'app_run_challenge')
+
+    def test_items_by_uid(self):
+        self.assertUsesIndex(CollectibleItem.objects.filter(uid__in=['uid_1', 'uid_2']), 'app_run_collectibleitem')
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app_run import challenges, response_cache
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, AthleteStats
+from app_run.tests.test_api import make_xlsx
+from app_run.views import collect_items
+
+START = datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+
+
+# Кэш выключен по умолчанию; версии живут в кэше, а не в базе, и не откатываются вместе с тестом.
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        response_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='Kristina', first_name='Kristina')
+        self.other = User.objects.create(username='Ivan')
+        self.athlete_info = AthleteInfo.objects.create(user=self.user)
+        self.item = CollectibleItem.objects.create(name='apple', uid='uid_1', latitude=50, longitude=50, value=1,
+                                                   picture='https://example.com/apple.png')
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertCached(self, name, *args, **params):
+        self.assertEqual(self.get(name, *args, **params)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(name, *args, **params)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        # Для профиля пользователя остаётся запрос состояния для ETag.
+        self.assertEqual(len(queries), 1 if name == 'api-users-detail' else 0)
+        return response
+
+    def assertMiss(self, name, *args, **params):
+        response = self.get(name, *args, **params)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        return response
+
+    def test_company_details(self):
+        response = self.assertCached('company_details')
+        self.assertEqual(response.json()['company_name'], 'Бегуны до 18')
+
+    def test_query_params_are_part_of_key(self):
+        self.assertCached('api-collectible-item-list')
+        self.assertMiss('api-collectible-item-list', page=1)
+        self.assertEqual(self.get('api-collectible-item-list', page=1)['X-Cache'], 'HIT')
+
+    def test_items_invalidated_on_save_and_delete(self):
+        self.assertCached('api-collectible-item-list')
+        self.assertCached('api-collectible-item-detail', self.item.id)
+        self.item.name = 'pear'
+        self.item.save()
+        self.assertEqual(self.assertMiss('api-collectible-item-list').json()[0]['name'], 'pear')
+        self.assertEqual(self.assertMiss('api-collectible-item-detail', self.item.id).json()['name'], 'pear')
+        self.item.delete()
+        self.assertEqual(self.assertMiss('api-collectible-item-list').json(), [])
+
+    def test_items_invalidated_on_upload(self):
+        self.assertCached('api-collectible-item-list')
+        rows = [['Item', 'file_uid', 1, 10, 10, 'https://example.com/1.png']]
+        self.client.post(reverse('api-upload-file'), {'file': make_xlsx(rows)})
+        self.assertEqual(len(self.assertMiss('api-collectible-item-list').json()), 2)
+
+    def test_challenges_invalidated(self):
+        self.assertCached('api-challenges-list')
+        self.assertCached('api-challenges-list', athlete=self.athlete_info.id)
+        Challenge.objects.create(athlete=self.athlete_info, full_name='Challenge')
+        self.assertEqual(len(self.assertMiss('api-challenges-list', athlete=self.athlete_info.id).json()), 1)
+
+        # Награды вставляются bulk_create, без post_save.
+        self.assertCached('api-challenges-list')
+        challenges.award(self.athlete_info, AthleteStats(user=self.user, finished_runs=10))
+        self.assertEqual(len(self.assertMiss('api-challenges-list').json()), 2)
+        # Уже полученная награда кэш не сбрасывает.
+        self.get('api-challenges-list')
+        challenges.award(self.athlete_info, AthleteStats(user=self.user, finished_runs=11))
+        self.assertEqual(self.get('api-challenges-list')['X-Cache'], 'HIT')
+
+    def test_user_invalidated_precisely(self):
+        self.assertCached('api-users-detail', self.user.id)
+        self.assertCached('api-users-detail', self.other.id)
+
+        self.user.collectible_items.add(self.item)
+        self.assertEqual(len(self.assertMiss('api-users-detail', self.user.id).json()['items']), 1)
+        self.assertEqual(self.get('api-users-detail', self.other.id)['X-Cache'], 'HIT')
+
+        self.item.name = 'pear'
+        self.item.save()
+        self.assertEqual(self.assertMiss('api-users-detail', self.user.id).json()['items'][0]['name'], 'pear')
+
+        self.user.first_name = 'Kris'
+        self.user.save()
+        self.assertEqual(self.assertMiss('api-users-detail', self.user.id).json()['first_name'], 'Kris')
+
+        self.athlete_info.weight = 60
+        self.athlete_info.save()
+        self.assertMiss('api-users-detail', self.user.id)
+
+    def test_user_invalidated_on_run_stop(self):
+        self.assertCached('api-users-detail', self.user.id)
+        run = Run.objects.create(athlete=self.user, status='in_progress')
+        self.assertMiss('api-users-detail', self.user.id)
+        self.get('api-users-detail', self.user.id)
+
+        points = [(10 + j / 1000, 10, START + timedelta(seconds=j)) for j in range(3)]
+        Position.objects.bulk_create([Position(run=run, latitude=lat, longitude=lon, date_time=date_time)
+                                      for lat, lon, date_time in points])
+        run.extend_track(points)
+        response = self.client.post(reverse('api-runs-stop', args=[run.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assertMiss('api-users-detail', self.user.id).json()['runs_finished'], 1)
+
+    def test_user_invalidated_on_rebuild_stats(self):
+        self.assertCached('api-users-detail', self.user.id)
+        self.assertCached('api-users-detail', self.other.id)
+        call_command('rebuild_athlete_stats', self.user.id, stdout=StringIO())
+        self.assertMiss('api-users-detail', self.user.id)
+        self.assertEqual(self.get('api-users-detail', self.other.id)['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn('X-Cache', self.get('api-collectible-item-list'))
+        # Инвалидация при выключенном кэше к нему не обращается.
+        response_cache.get_cache().clear()
+        self.item.name = 'pear'
+        self.item.save()
+        self.assertEqual(response_cache.get_cache().get_many(
+            [response_cache._version_key(response_cache.ITEMS)]), {})
+
+    def test_user_not_invalidated_on_track_update(self):
+        run = Run.objects.create(athlete=self.user, status='in_progress')
+        self.assertCached('api-users-detail', self.user.id)
+        run.extend_track([(10, 10, START), (10.001, 10, START + timedelta(seconds=1))])
+        self.assertEqual(self.get('api-users-detail', self.user.id)['X-Cache'], 'HIT')
+
+    def test_user_invalidated_on_collect_items(self):
+        self.assertCached('api-users-detail', self.user.id)
+        collect_items(self.user, [(50, 50)])
+        self.assertEqual(len(self.assertMiss('api-users-detail', self.user.id).json()['items']), 1)
+
+    def test_invalidated_again_on_commit(self):
+        self.assertCached('api-collectible-item-list')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response_cache.invalidate(response_cache.ITEMS)
+            # Ответ, закэшированный до фиксации транзакции, сбрасывается ещё раз после неё.
+            self.assertMiss('api-collectible-item-list')
+            self.assertEqual(self.get('api-collectible-item-list')['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertMiss('api-collectible-item-list')
+
+    def test_stats(self):
+        response_cache.reset_stats()
+        self.assertCached('api-collectible-item-list')
+        self.get('api-collectible-item-list')
+        stats = self.get('cache_stats').json()
+        self.assertEqual(stats['CollectibleItemViewSet.list'], {'hits': 2, 'misses': 1})
+        self.assertEqual(stats['view_about'], {'hits': 0, 'misses': 0})
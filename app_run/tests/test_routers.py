@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app_run import response_cache
+from app_run.models import Run
+from app_run.routers import ReplicaRouter, read_from_replica
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Run), 'default')
+
+    def test_read_from_replica(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Run), 'replica')
+            self.assertEqual(self.router.db_for_write(Run), 'default')
+            with read_from_replica(False):
+                self.assertEqual(self.router.db_for_read(Run), 'default')
+        self.assertEqual(self.router.db_for_read(Run), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Run), 'default')
+
+    def test_allow_migrate(self):
+        self.assertTrue(self.router.allow_migrate('default', 'app_run'))
+        self.assertFalse(self.router.allow_migrate('replica', 'app_run'))
+
+
+# 'replica' в тестовых настройках — зеркало default, поэтому данные видны с обоих алиасов.
+# Кэш ответов выключен: иначе повторный запрос не дойдёт до базы.
+@override_settings(DATABASE_REPLICAS=['replica'], RESPONSE_CACHE_ENABLED=False)
+class ReplicaMiddlewareTestCase(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username='Kristina')
+        self.run = Run.objects.create(athlete=self.user, status='init')
+
+    def count_queries(self, request):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return len(primary), len(replica)
+
+    def test_safe_requests_read_from_replica(self):
+        for url in (reverse('api-runs-list'), reverse('api-users-list'), reverse('api-positions-list'),
+                    reverse('api-challenges-list')):
+            primary, replica = self.count_queries(lambda: self.client.get(url))
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+
+    def test_read_your_writes(self):
+        primary, replica = self.count_queries(
+            lambda: self.client.post(reverse('api-runs-start', args=[self.run.id])))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertIn('read_primary', self.client.cookies)
+
+        primary, replica = self.count_queries(lambda: self.client.get(reverse('api-runs-detail', args=[self.run.id])))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        del self.client.cookies['read_primary']
+        primary, replica = self.count_queries(lambda: self.client.get(reverse('api-runs-detail', args=[self.run.id])))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_cache_miss_reads_from_primary(self):
+        response_cache.get_cache().clear()
+        url = reverse('api-challenges-list')
+        self.assertEqual(self.count_queries(lambda: self.client.get(url)), (1, 0))
+        self.assertEqual(self.count_queries(lambda: self.client.get(url)), (0, 0))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        primary, replica = self.count_queries(lambda: self.client.get(reverse('api-runs-list')))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.client.post(reverse('api-runs-start', args=[self.run.id]))
+        self.assertNotIn('read_primary', self.client.cookies)
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from project_run.settings import database
+from project_run.settings.database import connection_settings
+
+
+class ConnectionSettingsTestCase(SimpleTestCase):
+    def test_persistent_connections_by_default(self):
+        with mock.patch.object(database, 'pool_available', return_value=False):
+            self.assertEqual(connection_settings({}), {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True})
+
+    def test_persistent_connections_from_env(self):
+        settings = connection_settings({'DB_POOL': 'off', 'DB_CONN_MAX_AGE': '0', 'DB_CONN_HEALTH_CHECKS': 'false'})
+        self.assertEqual(settings, {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False})
+
+    def test_pool_when_available(self):
+        with mock.patch.object(database, 'pool_available', return_value=True):
+            settings = connection_settings({'DB_POOL_MAX_SIZE': '8', 'DB_POOL_TIMEOUT': '2.5'})
+        self.assertEqual(settings, {'CONN_MAX_AGE': 0,
+                                    'OPTIONS': {'pool': {'min_size': 1, 'max_size': 8, 'timeout': 2.5}}})
+
+    def test_pool_disabled(self):
+        with mock.patch.object(database, 'pool_available', return_value=True):
+            self.assertNotIn('OPTIONS', connection_settings({'DB_POOL': '0'}))
+
+    def test_production_settings(self):
+        from project_run.settings import production
+
+        default = production.DATABASES['default']
+        self.assertEqual(default['ENGINE'], 'django.db.backends.postgresql')
+        self.assertIn('CONN_MAX_AGE', default)
+
+
+class ReplicaDatabasesTestCase(SimpleTestCase):
+    primary = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'db', 'USER': 'user', 'PASSWORD': 'pass',
+               'HOST': 'primary', 'PORT': '5432'}
+
+    def test_no_replicas(self):
+        self.assertEqual(database.replica_databases(self.primary, {}), {})
+
+    def test_replicas_from_env(self):
+        replicas = database.replica_databases(self.primary, {'DB_REPLICA_HOSTS': 'replica-a, replica-b:6432',
+                                                             'DB_REPLICA_USER': 'reader'})
+        self.assertEqual(list(replicas), ['replica_1', 'replica_2'])
+        self.assertEqual(replicas['replica_1'], {**self.primary, 'HOST': 'replica-a', 'USER': 'reader',
+                                                 'TEST': {'MIRROR': 'default'}})
+        self.assertEqual((replicas['replica_2']['HOST'], replicas['replica_2']['PORT']), ('replica-b', '6432'))
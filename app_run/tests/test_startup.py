@@ -0,0 +1,28 @@
+"""Холодный старт (Zappa): тяжёлые зависимости не грузятся при импорте WSGI-приложения."""
+from django.test import SimpleTestCase
+
+from app_run.management.commands.profile_startup import measure_startup
+
+# С запасом: локально ~0.3 с, в CI машины медленнее.
+MAX_APP_READY_MS = 3000
+
+
+class StartupTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.result = measure_startup('/api/company_details/')
+
+    def test_first_request(self):
+        self.assertEqual(self.result['status'], '200 OK')
+
+    def test_heavy_modules_are_lazy(self):
+        self.assertEqual(self.result['heavy_modules'], [])
+
+    def test_app_ready_time(self):
+        self.assertLess(self.result['app_ready_ms'], MAX_APP_READY_MS)
+
+    def test_import_times_reported(self):
+        modules = {row['module'] for row in self.result['imports']}
+        self.assertIn('project_run.wsgi', modules)
+        self.assertIn('app_run.views', modules)
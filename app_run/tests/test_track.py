@@ -0,0 +1,86 @@
+import random
+
+from django.test import SimpleTestCase
+from geopy.distance import geodesic
+
+from app_run.track import pairwise_distances, segment_lengths, track_length_km, distance_matrix, simplify, \
+    HAVERSINE, ELLIPSOIDAL
+
+
+class TrackDistanceTestCase(SimpleTestCase):
+    def random_segments(self, count, meters):
+        rnd = random.Random(meters)
+        for _ in range(count):
+            start = (rnd.uniform(-85, 85), rnd.uniform(-180, 180))
+            end = geodesic(meters=meters).destination(start, rnd.uniform(0, 360))
+            yield start, (end.latitude, end.longitude)
+
+    def test_ellipsoidal_error_bound(self):
+        for meters in (1, 50, 1000, 100_000, 1_000_000):
+            for start, end in self.random_segments(200, meters):
+                expected = geodesic(start, end).meters
+                actual = pairwise_distances(*start, *end, method=ELLIPSOIDAL)
+                self.assertLess(abs(actual - expected) / expected, 2e-6)
+
+    def test_haversine_error_bound(self):
+        for start, end in self.random_segments(200, 1000):
+            expected = geodesic(start, end).meters
+            actual = pairwise_distances(*start, *end, method=HAVERSINE)
+            self.assertLess(abs(actual - expected) / expected, 6e-3)
+
+    def test_same_point(self):
+        self.assertEqual(pairwise_distances(55.75, 37.61, 55.75, 37.61), 0)
+
+    def test_segment_lengths(self):
+        latitudes = [0.001, 0.010, 0.5]
+        longitudes = [0.001, 0.011, 0.9]
+        lengths = segment_lengths(latitudes, longitudes)
+        self.assertEqual(len(lengths), 2)
+        self.assertAlmostEqual(lengths[0], geodesic((0.001, 0.001), (0.010, 0.011)).meters, places=2)
+
+    def test_track_length_km(self):
+        points = [(0.001, 0.001), (0.010, 0.011), (0.5, 0.9)]
+        expected = geodesic(points[0], points[1]).kilometers + geodesic(points[1], points[2]).kilometers
+        self.assertLess(abs(track_length_km(points) - expected) / expected, 2e-6)
+        self.assertEqual(track_length_km(points[:1]), 0)
+
+    def test_distance_matrix(self):
+        matrix = distance_matrix([(10, 10), (20, 20)], [10, 20, 30], [10, 20, 30])
+        self.assertEqual(matrix.shape, (2, 3))
+        self.assertEqual(matrix[0, 0], 0)
+        self.assertEqual(matrix[1, 1], 0)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            pairwise_distances(0, 0, 1, 1, method='vincenty')
+
+
+class SimplifyTestCase(SimpleTestCase):
+    def test_straight_line(self):
+        latitudes = [55.75 + i * 0.0001 for i in range(100)]
+        longitudes = [37.61] * 100
+        self.assertEqual([0, 99], simplify(latitudes, longitudes, 1).tolist())
+
+    def test_keeps_corner(self):
+        latitudes = [0, 0.001, 0.002, 0.002, 0.002]
+        longitudes = [0, 0, 0, 0.001, 0.002]
+        self.assertEqual([0, 2, 4], simplify(latitudes, longitudes, 5).tolist())
+
+    def test_closed_loop(self):
+        latitudes = [0, 0.001, 0.001, 0, 0]
+        longitudes = [0, 0, 0.001, 0.001, 0]
+        self.assertEqual([0, 1, 2, 3, 4], simplify(latitudes, longitudes, 5).tolist())
+
+    def test_error_within_tolerance(self):
+        rnd = random.Random(1)
+        latitudes, longitudes = [55.75], [37.61]
+        for _ in range(2000):
+            latitudes.append(latitudes[-1] + rnd.gauss(0, 0.0001))
+            longitudes.append(longitudes[-1] + rnd.gauss(0, 0.0001))
+        for tolerance in (2, 20, 100):
+            kept = simplify(latitudes, longitudes, tolerance)
+            self.assertLess(len(kept), len(latitudes))
+            self.assertEqual((0, len(latitudes) - 1), (kept[0], kept[-1]))
+
+    def test_zero_tolerance(self):
+        self.assertEqual([0, 1, 2], simplify([0, 0.001, 0.002], [0, 0, 0], 0).tolist())
@@ -0,0 +1,122 @@
+"""Векторные расчёты расстояний по трекам.
+
+Методы:
+
+* ``haversine`` — сфера среднего радиуса. Погрешность относительно геодезического
+  расстояния на эллипсоиде WGS-84 (geopy ``geodesic``) до ~0.6%.
+* ``ellipsoidal`` — формула Ламберта (Andoyer–Lambert) для WGS-84: сферическое
+  расстояние по приведённым широтам с поправкой первого порядка по сжатию.
+  На отрезках от 1 м до 1000 км относительная погрешность не превышает 2e-6
+  (на GPS-отрезках в десятки метров это сотые доли миллиметра), см. tests/test_track.py.
+"""
+import numpy as np
+
+HAVERSINE = 'haversine'
+ELLIPSOIDAL = 'ellipsoidal'
+METHODS = (HAVERSINE, ELLIPSOIDAL)
+
+EARTH_MEAN_RADIUS = 6_371_008.8
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    return 2 * np.arcsin(np.sqrt(
+        np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2))
+
+
+def _lambert(lat1, lon1, lat2, lon2):
+    beta1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    beta2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sigma = _haversine(beta1, lon1, beta2, lon2)
+
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+    half_sigma = sigma / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (sigma - np.sin(sigma)) * np.sin(p) ** 2 * np.cos(q) ** 2 / np.cos(half_sigma) ** 2
+        y = (sigma + np.sin(sigma)) * np.cos(p) ** 2 * np.sin(q) ** 2 / np.sin(half_sigma) ** 2
+    correction = np.where(sigma > 0, x + y, 0)
+    return WGS84_A * (sigma - WGS84_F / 2 * correction)
+
+
+def pairwise_distances(lat1, lon1, lat2, lon2, method=ELLIPSOIDAL):
+    """Расстояния в метрах между точками (lat1, lon1) и (lat2, lon2) с broadcasting numpy."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    if method == HAVERSINE:
+        return EARTH_MEAN_RADIUS * _haversine(lat1, lon1, lat2, lon2)
+    if method == ELLIPSOIDAL:
+        return _lambert(lat1, lon1, lat2, lon2)
+    raise ValueError(f'Unknown distance method: {method}')
+
+
+def segment_lengths(latitudes, longitudes, method=ELLIPSOIDAL):
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    return pairwise_distances(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:], method)
+
+
+def track_length_km(points, method=ELLIPSOIDAL):
+    """Длина трека в километрах по списку точек (latitude, longitude)."""
+    if len(points) < 2:
+        return 0.0
+    coordinates = np.asarray(points, dtype=float)
+    return float(segment_lengths(coordinates[:, 0], coordinates[:, 1], method).sum()) / 1000
+
+
+def distance_matrix(points, latitudes, longitudes, method=ELLIPSOIDAL):
+    """Матрица расстояний в метрах: строки — points, столбцы — (latitudes, longitudes)."""
+    coordinates = np.asarray(points, dtype=float).reshape(-1, 2)
+    return pairwise_distances(coordinates[:, :1], coordinates[:, 1:], np.asarray(latitudes, dtype=float)[None, :],
+                              np.asarray(longitudes, dtype=float)[None, :], method)
+
+
+def simplify(latitudes, longitudes, tolerance_m):
+    """Индексы точек, оставшихся после упрощения Дугласа–Пекера с допуском tolerance_m метров.
+
+    Координаты проецируются в локальные метры (равнопромежуточная проекция). Вместо рекурсии
+    все ещё не упрощённые отрезки обрабатываются одновременно: за проход считаются расстояния
+    всех их внутренних точек и делятся отрезки, где максимум больше допуска. Результат совпадает
+    с рекурсивным алгоритмом, проходов — столько, какова глубина рекурсии.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    count = len(latitudes)
+    if count < 3 or tolerance_m <= 0:
+        return np.arange(count)
+
+    y = np.radians(latitudes) * EARTH_MEAN_RADIUS
+    x = np.radians(longitudes) * EARTH_MEAN_RADIUS * np.cos(np.radians(latitudes.mean()))
+    indexes = np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    # done[i] — отрезок, начинающийся в сохранённой точке i, уже не нужно делить.
+    done = np.zeros(count, dtype=bool)
+    while True:
+        kept = np.flatnonzero(keep)
+        owner = np.searchsorted(kept, indexes, side='right') - 1
+        points = np.flatnonzero(~keep & ~done[kept[np.minimum(owner, len(kept) - 2)]])
+        if not len(points):
+            break
+
+        segment = owner[points]
+        start, end = kept[segment], kept[segment + 1]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[points] - x[start], y[points] - y[start]
+        length_sq = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length_sq > 0, np.clip((px * dx + py * dy) / length_sq, 0, 1), 0)
+        distances = np.hypot(px - t * dx, py - t * dy)
+
+        # Точки идут подряд по отрезкам: максимум и первый argmax для каждой группы через reduceat.
+        groups = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1]])
+        maximums = np.maximum.reduceat(distances, groups)
+        sizes = np.diff(np.r_[groups, len(points)])
+        is_max = distances == np.repeat(maximums, sizes)
+        first_max = np.minimum.reduceat(np.where(is_max, np.arange(len(points)), len(points)), groups)
+
+        split = maximums > tolerance_m
+        done[start[groups[~split]]] = True
+        keep[points[first_max[split]]] = True
+    return np.flatnonzero(keep)
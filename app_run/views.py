@@ -1,23 +1,59 @@
+import json
+from itertools import islice
+
 from django.contrib.auth.models import User
-from django.db.models import Sum, Min, Max
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from geopy.distance import geodesic
-from openpyxl.reader.excel import load_workbook
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, action
 from django.conf import settings
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem
+from app_run import challenges
+from app_run.conditional import run_conditional, positions_conditional, user_conditional
+from app_run.geo import nearby_cells_q_for_points, PICKUP_RADIUS_M
+from app_run.imports import import_collectible_items
+from app_run.jobs import submit_import_job
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, ImportJob, RunTrack, AthleteStats
+from app_run.response_cache import cached_response, invalidate, user_namespace, ITEMS, CHALLENGES, stats as cache_stats
 from app_run.serializers import RunSerializer, UserSerializer, AthleteInfoSerializer, ChallengeSerializer, \
-    PositionSerializer, CollectibleItemSerializer, UserCollectibleItemsSerializer
+    PositionSerializer, CollectibleItemSerializer, UserCollectibleItemsSerializer, PositionBatchSerializer, \
+    PositionBatchItemSerializer, ImportJobSerializer, PositionRowSerializer, RunTrackSerializer, \
+    RunTrackTimestampsSerializer
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def collect_items(athlete, points):
+    """Добавляет атлету предметы в радиусе PICKUP_RADIUS_M от точек: один SELECT и один INSERT."""
+    candidates = list(CollectibleItem.objects.filter(nearby_cells_q_for_points(points))
+                      .exclude(collected_by=athlete).values_list('id', 'latitude', 'longitude'))
+    if not candidates:
+        return
+
+    from app_run.track import distance_matrix  # numpy не нужен при холодном старте.
+
+    ids, latitudes, longitudes = zip(*candidates)
+    distances = distance_matrix(points, latitudes, longitudes).min(axis=0)
+    Through = CollectibleItem.collected_by.through
+    rows = [Through(user_id=athlete.id, collectibleitem_id=item_id)
+            for item_id, distance in zip(ids, distances) if distance <= PICKUP_RADIUS_M]
+
+    if rows:
+        # bulk_create в обход add(): сигнал m2m_changed не отправляется, итоги обновляются явно.
+        Through.objects.bulk_create(rows, ignore_conflicts=True)
+        AthleteStats.refresh_items([athlete.id])
+        invalidate(user_namespace(athlete.id))
 
 
 @api_view(['GET'])
+@cached_response()
 def view_about(request):
     details = {
         'company_name': settings.COMPANY_NAME,
@@ -27,14 +63,43 @@ def view_about(request):
     return Response(details)
 
 
-class RunPagination(PageNumberPagination):
+class KeysetPagination(CursorPagination):
+    page_size = 50
     page_size_query_param = 'size'
     max_page_size = 50
+    ordering = 'id'
 
 
-class UserPagination(PageNumberPagination):
+class SelectablePagination(PageNumberPagination):
+    """Постраничная пагинация; с ?pagination=cursor (или ?cursor=...) — курсорная, без COUNT и OFFSET."""
     page_size_query_param = 'size'
     max_page_size = 50
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        params = request.query_params
+        if params.get('pagination') == 'cursor' or self.cursor_pagination_class.cursor_query_param in params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RunPagination(SelectablePagination):
+    pass
+
+
+class UserPagination(SelectablePagination):
+    pass
+
+
+class PositionPagination(SelectablePagination):
+    pass
 
 
 class RunViewSet(viewsets.ModelViewSet):
@@ -46,6 +111,22 @@ class RunViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at']
     ordering = ['id']  # Сортировка по умолчанию
 
+    @run_conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True)
+    def track(self, request, pk=None):
+        zoom = request.query_params.get('zoom')
+        try:
+            tolerance = RunTrack.tolerance_for_zoom(int(zoom)) if zoom else 0
+        except ValueError:
+            return Response({'error': 'Invalid zoom!'}, status=status.HTTP_400_BAD_REQUEST)
+        track = RunTrack.for_run(self.get_object(), tolerance)
+        if request.query_params.get('timestamps') in ('1', 'true'):
+            return Response(RunTrackTimestampsSerializer(track).data)
+        return Response(RunTrackSerializer(track).data)
+
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.filter(is_superuser=False)
@@ -56,7 +137,9 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['date_joined']
 
     def get_queryset(self):
-        qs = self.queryset
+        qs = self.queryset.select_related('stats')
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related('collectible_items')
         type = self.request.query_params.get('type')
         if type == 'coach':
             qs = qs.filter(is_staff=True)
@@ -71,77 +154,60 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             return UserCollectibleItemsSerializer
         return super().get_serializer_class()
 
+    @user_conditional
+    @cached_response(ITEMS, user_namespace('{pk}'))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class RunStartAPIView(APIView):
     def post(self, request, run_id):
-        run = get_object_or_404(Run, id=run_id)
+        run = Run.objects.transition(run_id, 'init', 'in_progress')
 
-        if run.status != 'init':
+        if run is None:
+            get_object_or_404(Run, id=run_id)
             return Response({'detail': 'Invalid run status for starting.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        run.status = 'in_progress'
-        run.save()
-
         return Response(RunSerializer(run).data, status=status.HTTP_201_CREATED)
 
 
 class RunStopAPIView(APIView):
+    @transaction.atomic
     def post(self, request, run_id):
-        run = get_object_or_404(Run, id=run_id)
+        # Побочные эффекты выполняет только запрос, чей условный UPDATE перевёл забег в finished.
+        run = Run.objects.transition(run_id, 'in_progress', 'finished')
 
-        if run.status != 'in_progress':
+        if run is None:
+            get_object_or_404(Run, id=run_id)
             return Response({'detail': 'Invalid run status for starting.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = run.athlete
+        # Итоги атлета меняются в обход сигналов Run.
+        invalidate(user_namespace(run.athlete_id))
 
-        positions = list(run.positions.all().order_by('id'))
-
-        if len(positions) < 2:
-            run.status = 'finished'
-            run.save()
+        if run.positions_count < 2:
+            AthleteStats.add_run(run)
             return Response({'error': 'Run stopped.  Not enough positions to calculate distance.'},
                             status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-        total_distance = 0
-        previous_coordinate = None
-
-        for position in positions:
-            coordinates = (position.latitude, position.longitude)
-
-            if previous_coordinate is not None:
-                distance = geodesic(previous_coordinate, coordinates).kilometers
-                total_distance += distance
+        run.distance = round(run.track_distance, 3)
 
-            previous_coordinate = coordinates
-
-        run.distance = round(total_distance, 3)
-        run.status = 'finished'
-
-        run_agg = run.positions.aggregate(min_time=Min('date_time'), max_time=Max('date_time'))
-        min_time = run_agg['min_time']
-        max_time = run_agg['max_time']
-
-        if min_time and max_time:
-            run_time = max_time - min_time
+        if run.min_date_time and run.max_date_time:
+            run_time = run.max_date_time - run.min_date_time
             run.run_time_seconds = int(run_time.total_seconds())
 
-        run.save(update_fields=['status', 'distance', 'run_time_seconds'])
-
-        sum_distance = Run.objects.filter(athlete=user, status='finished').aggregate(total_sum=Sum('distance'))[
-                           'total_sum'] or 0
+        # Статус уже сменён условным UPDATE, поэтому итоги атлета обновляются здесь, а не в Run.save().
+        Run.objects.filter(id=run.id).update(distance=run.distance, run_time_seconds=run.run_time_seconds,
+                                             updated_at=timezone.now())
+        run._stats_state = run.stats_state()
+        stats = AthleteStats.add_run(run)
+        RunTrack.store_for_run(run)
 
         try:
-            athlete_info = user.athleteinfo
+            athlete_info = AthleteInfo.objects.get(user_id=run.athlete_id)
         except AthleteInfo.DoesNotExist:
             return Response({'detail': 'AthleteInfo not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if Run.objects.filter(athlete=user, status='finished').count() == 10:
-            if not Challenge.objects.filter(athlete=athlete_info, full_name='Сделай 10 Забегов!').exists():
-                Challenge.objects.create(athlete=athlete_info, full_name='Сделай 10 Забегов!')
-
-        if sum_distance >= 50:
-            if not Challenge.objects.filter(athlete=athlete_info, full_name='Пробеги 50 километров!').exists():
-                Challenge.objects.create(athlete=athlete_info, full_name='Пробеги 50 километров!')
+        challenges.award(athlete_info, stats, run)
 
         return Response(RunSerializer(run).data, status=status.HTTP_200_OK)
 
@@ -183,26 +249,61 @@ class ChallengeViewSet(viewsets.ModelViewSet):
     serializer_class = ChallengeSerializer
 
     def get_queryset(self):
-        qs = self.queryset
+        qs = super().get_queryset()
         athlete_id = self.request.query_params.get('athlete')
         if athlete_id:
             qs = qs.filter(athlete__id=athlete_id)
             return qs
         return qs
 
+    @cached_response(CHALLENGES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(CHALLENGES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class PositionViewSet(viewsets.ModelViewSet):
     queryset = Position.objects.all()
     serializer_class = PositionSerializer
+    pagination_class = PositionPagination
 
     def get_queryset(self):
-        qs = Position.objects.all()
+        qs = Position.objects.order_by('id')
         run_id = self.request.query_params.get('run', None)
         if run_id:
             qs = qs.filter(run=run_id)
             return qs
         return qs
 
+    @positions_conditional
+    def list(self, request, *args, **kwargs):
+        stream = request.query_params.get('stream')
+        if stream == 'json':
+            return StreamingHttpResponse(self.stream_json(), content_type='application/json')
+        if stream == 'ndjson':
+            return StreamingHttpResponse(self.stream_ndjson(), content_type='application/x-ndjson')
+        return super().list(request, *args, **kwargs)
+
+    def stream_rows(self):
+        rows = self.get_queryset().values_list(*PositionRowSerializer.values).iterator(chunk_size=STREAM_CHUNK_SIZE)
+        while chunk := list(islice(rows, STREAM_CHUNK_SIZE)):
+            yield [json.dumps(PositionRowSerializer.to_representation(row), separators=(',', ':')) for row in chunk]
+
+    def stream_json(self):
+        yield '['
+        separator = ''
+        for lines in self.stream_rows():
+            yield separator + ','.join(lines)
+            separator = ','
+        yield ']'
+
+    def stream_ndjson(self):
+        for lines in self.stream_rows():
+            yield '\n'.join(lines) + '\n'
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -214,34 +315,52 @@ class PositionViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         position = serializer.save()
+        collect_items(position.run.athlete, [(position.latitude, position.longitude)])
 
-        athlete = position.run.athlete
-
-        items = list(CollectibleItem.objects.all())
-
-        collected_ids = set(athlete.collectible_items.values_list('id', flat=True))
-        items_add = []
-
-        pos_athlete = (position.latitude, position.longitude)
-
-        for item in items:
-            if item.id in collected_ids:
-                continue
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        serializer = PositionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        run = serializer.validated_data['run']
+
+        positions = []
+        errors = []
+        for index, item in enumerate(serializer.validated_data['positions']):
+            item_serializer = PositionBatchItemSerializer(data=item)
+            if item_serializer.is_valid():
+                positions.append(Position(run=run, **item_serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': item_serializer.errors})
 
-            pos_item = (item.latitude, item.longitude)
-            dist = geodesic(pos_athlete, pos_item).meters
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
 
-            if dist <= 100:
-                items_add.append(item)
+        with transaction.atomic():
+            # Забег блокируется до вставки, как в Position.save: параллельные пакеты ложатся в итоги
+            # в порядке id, а пакет, опоздавший к завершению забега, не меняет его итоги.
+            locked = Run.locked(run.id)
+            if locked.status != 'in_progress':
+                return Response({'run': ['Status run must be in_progress']}, status=status.HTTP_400_BAD_REQUEST)
+            positions = Position.objects.bulk_create(positions)
+            locked.extend_track(
+                [(position.latitude, position.longitude, position.date_time) for position in positions])
+            collect_items(run.athlete, [(position.latitude, position.longitude) for position in positions])
 
-            if items_add:
-                athlete.collectible_items.add(*items_add)
+        return Response({'ids': [position.id for position in positions]}, status=status.HTTP_201_CREATED)
 
 
 class CollectibleItemViewSet(viewsets.ModelViewSet):
     queryset = CollectibleItem.objects.all()
     serializer_class = CollectibleItemSerializer
 
+    @cached_response(ITEMS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(ITEMS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class UploadFileView(APIView):
     def post(self, request):
@@ -253,27 +372,22 @@ class UploadFileView(APIView):
         if not uploaded_file.name.endswith('.xlsx'):
             return Response({'error': 'File not xlsx.'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
 
-        wb = load_workbook(filename=uploaded_file, data_only=True)
-        # wb = load_workbook(r'C:\Users\pyatk\Downloads\upload_example.xlsx')
-        ws = wb.active
-        invalid_rows = []
-
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            row_list = list(row)
-
-            data = {
-                'name': row[0],
-                'uid': row[1],
-                'value': row[2],
-                'latitude': row[3],
-                'longitude': row[4],
-                'picture': row[5],
-            }
-            if CollectibleItem.objects.filter(uid=data['uid']).exists():
-                continue
-            serializer = CollectibleItemSerializer(data=data)
-            if serializer.is_valid():
-                serializer.save()
-            else:
-                invalid_rows.append(row_list)
+        background = request.query_params.get('background') or request.data.get('background')
+        if background in ('1', 'true'):
+            job = ImportJob.objects.create(file_name=uploaded_file.name, file=uploaded_file.read())
+            transaction.on_commit(lambda: submit_import_job(job.id))
+            return Response({'job_id': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
+        invalid_rows = import_collectible_items(uploaded_file)
         return Response(invalid_rows, status=status.HTTP_201_CREATED)
+
+
+class ImportJobView(APIView):
+    def get(self, request, job_id):
+        job = get_object_or_404(ImportJob.objects.defer('file'), id=job_id)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def view_cache_stats(request):
+    return Response(cache_stats())
@@ -0,0 +1,226 @@
+"""Нагрузочный прогон API на синтетических данных: задержки p50/p95/p99, SQL-запросы и пиковая память на запрос.
+
+    python benchmarks/api_bench.py --users 200 --requests 100 --output results.json
+    python benchmarks/api_bench.py --compare results.json
+
+Данные создаются командой generate_synthetic_data во временной базе. Запросы идут через
+полный стек Django (middleware, DRF) тестовым клиентом, без сети. Память меряется tracemalloc
+отдельным проходом, чтобы не искажать задержки.
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+
+from utils import setup_django, test_database, measure, summary_ms, ROOT
+
+setup_django()
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from openpyxl import Workbook  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from app_run.management.commands.generate_synthetic_data import LAT_RANGE, LON_RANGE  # noqa: E402
+from app_run.models import Run, Position, CollectibleItem  # noqa: E402
+
+
+class Scenario:
+    """Готовит аргументы для каждого запроса заранее, чтобы в замер попадал только сам запрос."""
+    name = None
+
+    def __init__(self, client, rnd):
+        self.client = client
+        self.rnd = rnd
+
+    def prepare(self, count):
+        return [None] * count
+
+    def request(self, argument):
+        raise NotImplementedError
+
+
+class PositionCreate(Scenario):
+    name = 'position_create'
+
+    def prepare(self, count):
+        runs = list(Run.objects.filter(status='in_progress').values_list('id', 'last_latitude', 'last_longitude',
+                                                                         'max_date_time'))
+        arguments = []
+        for i in range(count):
+            run_id, latitude, longitude, date_time = runs[i % len(runs)]
+            arguments.append({'run': run_id, 'latitude': round(latitude + self.rnd.uniform(-1e-4, 1e-4), 6),
+                              'longitude': round(longitude + self.rnd.uniform(-1e-4, 1e-4), 6),
+                              'date_time': (date_time + timedelta(seconds=i + 1)).strftime('%Y-%m-%dT%H:%M:%S.%f')})
+        return arguments
+
+    def request(self, data):
+        return self.client.post(reverse('api-positions-list'), data, format='json')
+
+
+class RunStop(Scenario):
+    name = 'run_stop'
+    positions_per_run = 200
+
+    def prepare(self, count):
+        run_ids = []
+        athletes = list(Run.objects.values_list('athlete_id', flat=True).distinct()[:count])
+        started_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i in range(count):
+            run = Run.objects.create(athlete_id=athletes[i % len(athletes)], status='in_progress')
+            latitude, longitude = self.rnd.uniform(*LAT_RANGE), self.rnd.uniform(*LON_RANGE)
+            points = [(latitude + j * 1e-4, longitude, started_at + timedelta(seconds=3 * j))
+                      for j in range(self.positions_per_run)]
+            Position.objects.bulk_create([Position(run=run, latitude=lat, longitude=lon, date_time=date_time)
+                                          for lat, lon, date_time in points])
+            run.extend_track(points)
+            run_ids.append(run.id)
+        return run_ids
+
+    def request(self, run_id):
+        return self.client.post(reverse('api-runs-stop', args=[run_id]))
+
+
+class UserList(Scenario):
+    name = 'user_list'
+
+    def request(self, argument):
+        return self.client.get(reverse('api-users-list'), {'size': 50, 'type': 'athlete'})
+
+
+class RunList(Scenario):
+    name = 'run_list'
+
+    def request(self, argument):
+        return self.client.get(reverse('api-runs-list'), {'size': 50, 'status': 'finished'})
+
+
+class XlsxUpload(Scenario):
+    name = 'xlsx_upload'
+    rows = 500
+
+    def prepare(self, count):
+        files = []
+        for i in range(count):
+            workbook = Workbook()
+            sheet = workbook.active
+            sheet.append(['Name', 'UID', 'Value', 'Latitude', 'Longitude', 'URL'])
+            for j in range(self.rows):
+                sheet.append([f'bench {i}-{j}', f'bench-{i}-{j}', 1, self.rnd.uniform(*LAT_RANGE),
+                              self.rnd.uniform(*LON_RANGE), 'https://example.com/p.png'])
+            buffer = BytesIO()
+            workbook.save(buffer)
+            files.append(buffer.getvalue())
+        return files
+
+    def request(self, content):
+        return self.client.post(reverse('api-upload-file'), {'file': SimpleUploadedFile('items.xlsx', content)})
+
+
+SCENARIOS = [PositionCreate, RunStop, UserList, RunList, XlsxUpload]
+
+
+def run_scenario(scenario, count, memory_count):
+    arguments = iter(scenario.prepare(count + memory_count))
+    query_counts = []
+
+    def request():
+        with CaptureQueriesContext(connection) as queries:
+            response = scenario.request(next(arguments))
+        assert response.status_code < 400, (scenario.name, response.status_code, response.content[:500])
+        query_counts.append(len(queries))
+
+    timings = summary_ms(measure(request, count))
+
+    peaks = []
+    tracemalloc.start()
+    for _ in range(memory_count):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        request()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        **{key: round(value, 3) for key, value in timings.items()},
+        'requests': count,
+        'queries_mean': round(sum(query_counts[:count]) / count, 2),
+        'queries_max': max(query_counts[:count]),
+        'peak_memory_kb': round(max(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    for name, result in results.items():
+        line = (f'{name:<16} p50 {result["p50"]:8.2f} ms  p95 {result["p95"]:8.2f} ms  p99 {result["p99"]:8.2f} ms  '
+                f'queries {result["queries_mean"]:6.1f}  peak {result["peak_memory_kb"]} KiB')
+        old = (baseline or {}).get(name)
+        if old:
+            line += f'  | p50 {(result["p50"] / old["p50"] - 1) * 100:+.0f}%  queries {old["queries_mean"]:.1f}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--runs-per-user', type=int, default=5)
+    parser.add_argument('--positions-per-run', type=int, default=200)
+    parser.add_argument('--items', type=int, default=20_000)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--memory-requests', type=int, default=5)
+    parser.add_argument('--scenarios', nargs='+', choices=[scenario.name for scenario in SCENARIOS])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON-файл для результатов.')
+    parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения.')
+    args = parser.parse_args()
+
+    # Предупреждения о медленных запросах из RequestMetricsMiddleware не нужны в выводе прогона.
+    logging.getLogger('app_run.metrics').setLevel(logging.ERROR)
+    baseline = json.load(open(args.compare))['results'] if args.compare else None
+
+    rnd = random.Random(args.seed)
+    with test_database():
+        call_command('generate_synthetic_data', users=args.users, runs_per_user=args.runs_per_user,
+                     positions_per_run=args.positions_per_run, items=args.items, seed=args.seed, stdout=StringIO())
+        client = APIClient()
+        results = {}
+        for scenario_class in SCENARIOS:
+            if args.scenarios and scenario_class.name not in args.scenarios:
+                continue
+            results[scenario_class.name] = run_scenario(scenario_class(client, rnd), args.requests,
+                                                        args.memory_requests)
+        items = CollectibleItem.objects.count()
+
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'data': {'users': args.users, 'runs_per_user': args.runs_per_user,
+                     'positions_per_run': args.positions_per_run, 'items': items},
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
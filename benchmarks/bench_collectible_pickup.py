@@ -0,0 +1,68 @@
+"""Задержка поиска собираемых предметов на одну точку: полный перебор vs сетка.
+
+    python benchmarks/bench_collectible_pickup.py --items 10000 100000
+"""
+import argparse
+import random
+
+from utils import setup_django, test_database, measure, summary_ms
+
+setup_django()
+
+from geopy.distance import geodesic  # noqa: E402
+
+from app_run.geo import nearby_cells_q, PICKUP_RADIUS_M  # noqa: E402
+from app_run.models import CollectibleItem  # noqa: E402
+
+# Район города ~55 x 30 км.
+LAT_RANGE = (55.5, 56.0)
+LON_RANGE = (37.3, 37.8)
+
+
+def seed_items(count, rnd):
+    items = []
+    for i in range(count):
+        item = CollectibleItem(name=f'item {i}', uid=f'bench-{i}', value=1, picture='https://example.com/p.png',
+                               latitude=rnd.uniform(*LAT_RANGE), longitude=rnd.uniform(*LON_RANGE))
+        item.update_cell()
+        items.append(item)
+    CollectibleItem.objects.bulk_create(items, batch_size=2000)
+
+
+def full_scan(point):
+    return [item for item in CollectibleItem.objects.all()
+            if geodesic(point, (item.latitude, item.longitude)).meters <= PICKUP_RADIUS_M]
+
+
+def grid_scan(point):
+    return [item for item in CollectibleItem.objects.filter(nearby_cells_q(*point))
+            if geodesic(point, (item.latitude, item.longitude)).meters <= PICKUP_RADIUS_M]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--positions', type=int, default=200)
+    parser.add_argument('--full-scan-positions', type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    with test_database():
+        for count in args.items:
+            CollectibleItem.objects.all().delete()
+            seed_items(count, rnd)
+            points = [(rnd.uniform(*LAT_RANGE), rnd.uniform(*LON_RANGE)) for _ in range(args.positions)]
+
+            for point in points[:args.full_scan_positions]:
+                assert {i.id for i in full_scan(point)} == {i.id for i in grid_scan(point)}
+
+            it = iter(points)
+            grid = summary_ms(measure(lambda: grid_scan(next(it)), len(points)))
+            it = iter(points)
+            full = summary_ms(measure(lambda: full_scan(next(it)), args.full_scan_positions))
+            print(f'{count:>7} items | full scan: mean {full["mean"]:9.1f} ms | '
+                  f'grid: mean {grid["mean"]:6.2f} ms p50 {grid["p50"]:6.2f} ms p95 {grid["p95"]:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
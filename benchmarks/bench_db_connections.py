@@ -0,0 +1,115 @@
+"""Пропускная способность /api/runs/ на PostgreSQL при разных режимах работы с соединениями.
+
+    DB_PASSWORD=... python benchmarks/bench_db_connections.py --threads 8 --requests 200
+
+Режимы (см. project_run/settings/database.py):
+    new connection  DB_CONN_MAX_AGE=0 — новое соединение на каждый запрос, как было в production.py;
+    persistent      DB_CONN_MAX_AGE=60 и проверка соединения перед запросом;
+    pool            пул psycopg (только при установленных psycopg 3 и psycopg_pool).
+
+Данные создаются generate_synthetic_data во временной базе, каждый режим запускается в отдельном
+процессе с project_run.settings.local_postgres и своими переменными окружения.
+
+Измеренных результатов пока нет: бенчмарк не запускался — при переходе на постоянные соединения
+и пул PostgreSQL под рукой не было. Ожидаемый выигрыш (без установки соединения на каждый запрос)
+нужно подтвердить этим скриптом до включения DB_POOL в production.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from io import StringIO
+
+from utils import setup_django, test_database
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_run.settings.local_postgres')
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from project_run.settings.database import pool_available  # noqa: E402
+
+MODES = {
+    'new connection': {'DB_POOL': 'off', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'off', 'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'on'},
+    'pool': {'DB_POOL': 'on'},
+}
+
+
+def worker(count, timings, barrier):
+    client = Client()
+    barrier.wait()
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.get('/api/runs/', {'size': 50, 'status': 'finished'})
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    connections.close_all()
+
+
+def child(threads, requests):
+    # Запросы идут через Client: сигналы request_started/request_finished закрывают или оставляют
+    # соединение так же, как на сервере.
+    timings = []
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(requests, timings, barrier)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
+
+    timings.sort()
+    print(json.dumps({'rps': len(timings) / elapsed, 'p50_ms': timings[len(timings) // 2] * 1000,
+                      'p95_ms': timings[int(len(timings) * 0.95)] * 1000}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--runs-per-user', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Запросов на поток.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.getLogger('app_run.metrics').setLevel(logging.ERROR)
+    if args.child:
+        child(args.threads, args.requests)
+        return
+    if connection.vendor != 'postgresql':
+        sys.exit('Нужен PostgreSQL: DJANGO_SETTINGS_MODULE=project_run.settings.local_postgres')
+
+    modes = {name: env for name, env in MODES.items() if name != 'pool' or pool_available()}
+    results = {}
+    with test_database():
+        call_command('generate_synthetic_data', users=args.users, runs_per_user=args.runs_per_user,
+                     positions_per_run=10, items=0, stdout=StringIO())
+        test_name = connection.settings_dict['NAME']
+        connection.close()
+        for name, env in modes.items():
+            process = subprocess.run(
+                [sys.executable, __file__, '--child', '--threads', str(args.threads), '--requests', str(args.requests)],
+                env={**os.environ, **env, 'DB_NAME': test_name}, capture_output=True, text=True, check=True)
+            results[name] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    if 'pool' not in modes:
+        print('pool: пропущен, нет psycopg 3 / psycopg_pool')
+    baseline = results['new connection']['rps']
+    for name, result in results.items():
+        print(f'{name:<16} {result["rps"]:8.1f} req/s  p50 {result["p50_ms"]:7.2f} ms  p95 {result["p95_ms"]:7.2f} ms'
+              f'  x{result["rps"] / baseline:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Горячие запросы до и после составных индексов (миграция 0034_hot_query_indexes).
+
+    python benchmarks/bench_indexes.py --users 300 --runs-per-user 10
+
+База заполняется generate_synthetic_data, затем откатывается на 0033 ("до") и снова
+накатывается ("после"); на каждом состоянии запросы выполняются для случайных забегов и атлетов.
+"""
+import argparse
+import random
+from io import StringIO
+
+from utils import setup_django, test_database, measure, summary_ms
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db.models import Min, Max  # noqa: E402
+
+from app_run.models import Run, Position, Challenge, AthleteStats  # noqa: E402
+
+BEFORE, AFTER = '0033_challenge_rule', '0034_hot_query_indexes'
+
+
+def hot_queries(run_ids, user_ids, athlete_info_ids):
+    return {
+        'positions by run': lambda: list(
+            Position.objects.filter(run_id=random.choice(run_ids)).order_by('id').values_list(
+                'latitude', 'longitude', 'date_time')),
+        'min/max time by run': lambda: Position.objects.filter(run_id=random.choice(run_ids)).aggregate(
+            Min('date_time'), Max('date_time')),
+        'runs by athlete+status': lambda: list(
+            Run.objects.filter(athlete_id=random.choice(user_ids), status='in_progress').values_list('id')),
+        'finished totals': lambda: AthleteStats.calculate(random.choice(user_ids)),
+        'challenge by name': lambda: Challenge.objects.filter(
+            athlete_id=random.choice(athlete_info_ids), full_name='Сделай 10 Забегов!').exists(),
+        'users by date_joined': lambda: list(User.objects.order_by('date_joined')[:50].values_list('id')),
+    }
+
+
+def run(queries, repeat):
+    return {name: summary_ms(measure(query, repeat)) for name, query in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--runs-per-user', type=int, default=10)
+    parser.add_argument('--positions-per-run', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    with test_database():
+        call_command('generate_synthetic_data', users=args.users, runs_per_user=args.runs_per_user,
+                     positions_per_run=args.positions_per_run, items=0, stdout=StringIO())
+        users = list(User.objects.select_related('athleteinfo'))
+        Challenge.objects.bulk_create([Challenge(athlete=user.athleteinfo, full_name=f'Challenge {i}')
+                                       for user in users for i in range(5)])
+        run_ids = list(Run.objects.values_list('id', flat=True))
+        user_ids = [user.id for user in users]
+        athlete_info_ids = [user.athleteinfo.id for user in users]
+        queries = hot_queries(run_ids, user_ids, athlete_info_ids)
+
+        results = {}
+        for label, migration in (('before', BEFORE), ('after', AFTER)):
+            call_command('migrate', 'app_run', migration, verbosity=0)
+            random.seed(1)
+            results[label] = run(queries, args.repeat)
+
+    print(f'users: {len(user_ids)}, runs: {len(run_ids)}, positions: {len(run_ids) * args.positions_per_run}')
+    for name in queries:
+        before, after = results['before'][name], results['after'][name]
+        print(f'{name:<24} before p50 {before["p50"]:7.3f} ms p95 {before["p95"]:7.3f} ms | '
+              f'after p50 {after["p50"]:7.3f} ms p95 {after["p95"]:7.3f} ms | x{before["p50"] / after["p50"]:.1f}')
+
+
+if __name__ == '__main__':
+    main()
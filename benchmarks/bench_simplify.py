@@ -0,0 +1,74 @@
+"""Упрощение трека Дугласа–Пекера: векторная версия app_run.track.simplify vs рекурсия на Python.
+
+    python benchmarks/bench_simplify.py --points 50000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from utils import setup_django
+
+setup_django()
+
+from app_run.models import RunTrack  # noqa: E402
+from app_run.track import simplify, EARTH_MEAN_RADIUS  # noqa: E402
+
+
+def random_track(count, rng):
+    # Пробежка: шаг ~3 м, плавно меняющееся направление и GPS-шум ~2 м.
+    heading = np.cumsum(rng.normal(0, 0.05, count))
+    step = 3 / EARTH_MEAN_RADIUS
+    latitudes = 55.75 + np.degrees(np.cumsum(np.cos(heading) * step)) + rng.normal(0, 2e-5, count)
+    longitudes = 37.61 + np.degrees(np.cumsum(np.sin(heading) * step)) / math.cos(math.radians(55.75))
+    return latitudes, longitudes + rng.normal(0, 3e-5, count)
+
+
+def simplify_python(latitudes, longitudes, tolerance):
+    cos_lat = math.cos(math.radians(sum(latitudes) / len(latitudes)))
+    xs = [math.radians(value) * EARTH_MEAN_RADIUS * cos_lat for value in longitudes]
+    ys = [math.radians(value) * EARTH_MEAN_RADIUS for value in latitudes]
+    keep = {0, len(xs) - 1}
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        start, end = stack.pop()
+        dx, dy = xs[end] - xs[start], ys[end] - ys[start]
+        length_sq = dx * dx + dy * dy
+        best, best_index = -1, None
+        for i in range(start + 1, end):
+            px, py = xs[i] - xs[start], ys[i] - ys[start]
+            t = min(1, max(0, (px * dx + py * dy) / length_sq)) if length_sq else 0
+            distance = math.hypot(px - t * dx, py - t * dy)
+            if distance > best:
+                best, best_index = distance, i
+        if best_index is not None and best > tolerance:
+            keep.add(best_index)
+            stack += [(start, best_index), (best_index, end)]
+    return sorted(keep)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=50_000)
+    args = parser.parse_args()
+
+    latitudes, longitudes = random_track(args.points, np.random.default_rng(42))
+    lat_list, lon_list = latitudes.tolist(), longitudes.tolist()
+    print(f'{args.points} points')
+    for zoom, tolerance in RunTrack.ZOOM_TOLERANCES.items():
+        started = time.perf_counter()
+        kept = simplify(latitudes, longitudes, tolerance)
+        vectorized = time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = simplify_python(lat_list, lon_list, tolerance)
+        python = time.perf_counter() - started
+        assert kept.tolist() == expected
+
+        print(f'zoom {zoom:>2} tolerance {tolerance:>5} m | {len(kept):>6} points | '
+              f'numpy {vectorized * 1000:7.1f} ms | python {python * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
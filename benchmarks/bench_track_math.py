@@ -0,0 +1,59 @@
+"""Длина трека: попарный geopy.geodesic в цикле vs векторный app_run.track.
+
+    python benchmarks/bench_track_math.py --points 1000 10000 100000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+from utils import ROOT
+
+sys.path.insert(0, str(ROOT))
+
+from app_run.track import segment_lengths, HAVERSINE, ELLIPSOIDAL  # noqa: E402
+
+
+def random_track(count, rng):
+    # Шаг ~5-15 м, как у GPS-трека пробежки.
+    latitudes = 55.75 + np.cumsum(rng.normal(0, 0.0001, count))
+    longitudes = 37.61 + np.cumsum(rng.normal(0, 0.00015, count))
+    return latitudes, longitudes
+
+
+def geopy_length(latitudes, longitudes):
+    points = list(zip(latitudes.tolist(), longitudes.tolist()))
+    return sum(geodesic(a, b).meters for a, b in zip(points, points[1:]))
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for count in args.points:
+        latitudes, longitudes = random_track(count, rng)
+        geopy_time, expected = best_of(lambda: geopy_length(latitudes, longitudes), 1)
+        line = f'{count:>7} points | geopy {geopy_time * 1000:9.1f} ms'
+        for method in (HAVERSINE, ELLIPSOIDAL):
+            elapsed, length = best_of(lambda: segment_lengths(latitudes, longitudes, method).sum(), 5)
+            error = abs(length - expected) / expected
+            line += f' | {method} {elapsed * 1000:7.2f} ms (x{geopy_time / elapsed:,.0f}, rel.err {error:.1e})'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_run.settings.local')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Временная база с применёнными миграциями.
+
+    Для sqlite — в памяти, даже если в настройках задан файл TEST NAME (он нужен тестам с потоками,
+    а замеры на файле были бы несравнимы с прежними).
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = None
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summary_ms(timings):
+    timings = sorted(timings)
+    return {
+        'mean': statistics.fmean(timings) * 1000,
+        'p50': timings[len(timings) // 2] * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+    }
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
@@ -45,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app_run.middleware.RequestMetricsMiddleware',
+    'app_run.middleware.ProfilingMiddleware',
+    'app_run.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -122,6 +125,49 @@ COMPANY_NAME = 'Бегуны до 18'
 SLOGAN = 'Молодые бегуны, обгонят всех!'
 CONTACTS = 'Город Москва, улица Ленина, дом 2'
 
+# Потоки локального пула для фоновых импортов xlsx; 0 — выполнять в процессе запроса.
+# Незавершённые задачи можно дообработать командой run_import_jobs.
+IMPORT_JOB_WORKERS = 2
+# Задача в статусе running дольше этого считается брошенной и снова берётся run_import_jobs.
+# Должно быть больше самого долгого импорта (на Lambda вызов ограничен 15 минутами).
+IMPORT_JOB_STALE_SECONDS = 30 * 60
+
+# Метрики запросов (число SQL-запросов, время БД, сериализации и всего запроса) в Server-Timing и логе
+# app_run.metrics. SAMPLE_RATE — доля измеряемых запросов; запросы медленнее SLOW_MS или с числом
+# SQL-запросов от SLOW_QUERIES пишутся с уровнем WARNING.
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_SAMPLE_RATE = 1.0
+REQUEST_METRICS_SLOW_MS = 500
+REQUEST_METRICS_SLOW_QUERIES = 50
+
+# Профилирование cProfile доли PROFILE_SAMPLE_RATE запросов к маршрутам PROFILE_ROUTES
+# ('api-runs-stop', 'api-positions-list:POST'); пустой список — профилирование выключено.
+PROFILE_ROUTES = []
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_BACKUP_COUNT = 5
+
+# Алиасы DATABASES, с которых безопасные запросы читают данные; пустой список — всё в default.
+# После записи клиент REPLICA_PIN_SECONDS читает из default (cookie REPLICA_PIN_COOKIE).
+DATABASE_ROUTERS = ['app_run.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_COOKIE = 'read_primary'
+REPLICA_PIN_SECONDS = 10
+
+# Кэш ответов редко меняющихся эндпоинтов (app_run.response_cache); инвалидация по сигналам моделей.
+# Выключен по умолчанию: locmem свой в каждом процессе, и инвалидация не доходит до других воркеров
+# и контейнеров Lambda. Включать только вместе с общим для всех процессов бэкендом в CACHES
+# (DatabaseCache после createcachetable, FileBasedCache на общем диске).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
 INTERNAL_IPS = [
     # ...
     "127.0.0.1",
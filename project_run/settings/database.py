@@ -0,0 +1,52 @@
+import os
+from importlib.util import find_spec
+
+
+def env_flag(name, default, environ=os.environ):
+    return environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def pool_available():
+    # Встроенный пул Django работает только с psycopg 3 и пакетом psycopg_pool, с psycopg2 его нет.
+    return find_spec('psycopg') is not None and find_spec('psycopg_pool') is not None
+
+
+def connection_settings(environ=os.environ):
+    """Повторное использование соединений с PostgreSQL: пул psycopg, если он доступен и DB_POOL не выключен,
+    иначе постоянные соединения на DB_CONN_MAX_AGE секунд с проверкой перед каждым запросом."""
+    if environ.get('DB_POOL', 'auto').strip().lower() == 'auto':
+        use_pool = pool_available()
+    else:
+        use_pool = env_flag('DB_POOL', 'off', environ)
+    if use_pool:
+        # Пул несовместим с постоянными соединениями: CONN_MAX_AGE должен быть 0.
+        return {
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'pool': {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 1)),
+                'max_size': int(environ.get('DB_POOL_MAX_SIZE', 4)),
+                'timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+            }},
+        }
+    return {
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', 'on', environ),
+    }
+
+
+def replica_databases(primary, environ=os.environ):
+    """Реплики из DB_REPLICA_HOSTS (через запятую; host или host:port): алиасы replica_1, replica_2, ...
+    с параметрами primary. В тестах реплики — зеркала default."""
+    databases = {}
+    hosts = [host.strip() for host in environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+    for number, host in enumerate(hosts, start=1):
+        host, _, port = host.partition(':')
+        databases[f'replica_{number}'] = {
+            **primary,
+            'HOST': host,
+            'PORT': port or primary.get('PORT', ''),
+            'USER': environ.get('DB_REPLICA_USER', primary.get('USER', '')),
+            'PASSWORD': environ.get('DB_REPLICA_PASSWORD', primary.get('PASSWORD', '')),
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
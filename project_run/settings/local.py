@@ -7,9 +7,23 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Тестовая база в файле, и конкурентная запись ждёт блокировку до timeout секунд: общая
+        # in-memory база отвечает потокам ошибкой 'table is locked' (RunParallelStopTestCase).
+        # Оба файла в .gitignore; бенчмарки (benchmarks/utils.py) по-прежнему создают базу в памяти.
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    # Та же база под видом реплики, чтобы проверять маршрутизацию чтения локально:
+    # DATABASE_REPLICAS = ['replica']. В тестах это зеркало тестовой default.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+REQUEST_METRICS_ENABLED = True
+
 # LOGGING = {
 #     "version": 1,
 #     "disable_existing_loggers": False,
@@ -25,4 +39,7 @@ DATABASES = {
 #             "level": "DEBUG",
 #         },
 #     },
-# }
\ No newline at end of file
+# }
+
+# Для вывода метрик запросов в консоль добавьте в LOGGING:
+#     "app_run.metrics": {"handlers": ["console"], "level": "INFO"},
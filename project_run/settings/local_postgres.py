@@ -0,0 +1,20 @@
+import os
+
+from .local import *
+from .database import connection_settings
+
+# Локальный PostgreSQL, например для app_run.tests.test_queries:
+#     DJANGO_SETTINGS_MODULE=project_run.settings.local_postgres python manage.py test app_run.tests.test_queries
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'project_run'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        **connection_settings(),
+    }
+}
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
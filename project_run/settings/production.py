@@ -1,6 +1,7 @@
 import os
 
 from .base import *
+from .database import connection_settings, replica_databases
 
 # Не редактируйте этот production файл, что не сломать наш продакшн сайт!
 
@@ -12,8 +13,14 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'db_pass'),
         'HOST': os.environ.get('DB_HOST', 'https://db_host_example.com'),
         'PORT': '5432',
+        # Соединения переиспользуются между запросами: DB_POOL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+        # DB_POOL_TIMEOUT, DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS (см. settings/database.py).
+        **connection_settings(),
     }
 }
+# Реплики для чтения: DB_REPLICA_HOSTS, DB_REPLICA_USER, DB_REPLICA_PASSWORD.
+DATABASES.update(replica_databases(DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
 
 AWS_STORAGE_BUCKET_NAME = 'zappa-ymqd03cou'
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
@@ -19,7 +19,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from app_run.views import view_about, RunViewSet, UserViewSet, RunStartAPIView, RunStopAPIView, AthleteInfoView, \
-    ChallengeViewSet, PositionViewSet, CollectibleItemViewSet, UploadFileView
+    ChallengeViewSet, PositionViewSet, CollectibleItemViewSet, UploadFileView, ImportJobView, \
+    view_cache_stats
 
 router = DefaultRouter()
 router.register('api/runs', RunViewSet, basename='api-runs')
@@ -32,11 +33,13 @@ router.register('api/collectible_item', CollectibleItemViewSet, basename='api-co
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/company_details/', view_about, name='company_details'),
+    path('api/cache_stats/', view_cache_stats, name='cache_stats'),
     path('', include(router.urls)),
     path('api/runs/<int:run_id>/start/', RunStartAPIView.as_view(), name='api-runs-start'),
     path('api/runs/<int:run_id>/stop/', RunStopAPIView.as_view(), name='api-runs-stop'),
     path('api/athlete_info/<int:user_id>/', AthleteInfoView.as_view(), name='api-athlete-info'),
     path('api/upload_file/', UploadFileView.as_view(), name='api-upload-file'),
+    path('api/upload_file/jobs/<int:job_id>/', ImportJobView.as_view(), name='api-upload-file-job'),
 
 
 ]